@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+import argparse
+import configparser
+import dataclasses
+import json
+import pathlib
+import signal
+import socket
+import subprocess  # nosec
+import sys
+import tempfile
+import time
+import typing
+import urllib.error
+import urllib.request
+
+from . import loadgen, standin
+
+
+@dataclasses.dataclass
+class Scenario:
+    drivers: list[str]
+    standin: standin.StandInConfig
+    main: dict[str, str] = dataclasses.field(default_factory=dict)
+
+
+SCENARIOS: typing.Final = {
+    "github": Scenario(
+        drivers=["github"],
+        standin=standin.StandInConfig(latency="lognormal:-2,0.5"),
+    ),
+    "github-uncached": Scenario(
+        drivers=["github"],
+        standin=standin.StandInConfig(latency="lognormal:-2,0.5"),
+        main={"result_cache_size": "0"},
+    ),
+    "bitbucket": Scenario(
+        drivers=["bitbucket"],
+        standin=standin.StandInConfig(latency="lognormal:-2,0.5"),
+    ),
+    "mixed-errors": Scenario(
+        drivers=["github", "bitbucket"],
+        standin=standin.StandInConfig(latency="exponential:0.15", error_rate=0.05),
+        main={"result_cache_size": "0"},
+    ),
+}
+
+REGRESSION_METRICS: typing.Final = {
+    "throughput": -1,
+    "p95": 1,
+    "p99": 1,
+}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return typing.cast(int, sock.getsockname()[1])
+
+
+def _write_config(path: pathlib.Path, scenario: Scenario, base_url: str, port: int) -> None:
+    config = configparser.ConfigParser()
+    config["main"] = {
+        "drivers": ", ".join(scenario.drivers),
+        "bind_address": "127.0.0.1",
+        "bind_port": str(port),
+        "log_level": "WARNING",
+        **scenario.main,
+    }
+    config["github"] = {
+        "base_url": f"{base_url}/repos/space",
+        "token": "benchmark",
+    }
+    config["bitbucket"] = {
+        "base_url": f"{base_url}/2.0/repositories/space",
+        "user": "benchmark",
+        "password": "benchmark",
+    }
+    with path.open("w", encoding="utf-8") as output:
+        config.write(output)
+
+
+def _wait_healthy(url: str, timeout: float) -> None:
+    end = time.monotonic() + timeout
+    while True:
+        try:
+            with urllib.request.urlopen(f"{url}/health", timeout=1):
+                return
+        except (urllib.error.URLError, OSError):
+            if time.monotonic() > end:
+                raise
+            time.sleep(0.1)
+
+
+def _run_scenario(name: str, scenario: Scenario, args: argparse.Namespace) -> dict[str, typing.Any]:
+    stand_in = standin.StandIn(
+        dataclasses.replace(
+            scenario.standin,
+            **{
+                key: value
+                for key, value in (
+                    ("latency", args.latency),
+                    ("error_rate", args.error_rate),
+                    ("payload_padding", args.payload_padding),
+                    ("runs", args.runs),
+                )
+                if value is not None
+            },
+        ),
+    )
+    stand_in.start()
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}"
+    with tempfile.TemporaryDirectory() as tmp:
+        config_file = pathlib.Path(tmp) / "config.ini"
+        _write_config(config_file, scenario, stand_in.base_url, port)
+        with subprocess.Popen(  # nosec
+            [sys.executable, "-m", "gerrit_checks_mock_fetch_endpoint", "--config", str(config_file)],
+            stderr=None if args.verbose else subprocess.DEVNULL,
+        ) as server:
+            try:
+                _wait_healthy(url, 10)
+                result = loadgen.run(
+                    url=f"{url}/fetch",
+                    concurrency=args.concurrency,
+                    duration=args.duration,
+                    changes=args.changes,
+                    seed=args.seed,
+                )
+                with urllib.request.urlopen(f"{url}/metrics", timeout=5) as response:
+                    metrics = json.load(response)
+            finally:
+                server.send_signal(signal.SIGTERM)
+                server.wait(30)
+    stand_in.stop()
+
+    summary = result.summary()
+    summary["upstream_calls"] = stand_in.calls
+    summary["upstream_errors"] = sum(
+        value for key, value in metrics.items() if key.startswith("upstream.") and key.endswith(".errors")
+    )
+    print(
+        f"{name:20} {summary['requests']:8.0f} req {summary['errors']:6.0f} err {summary['empty']:6.0f} empty "
+        + f"{summary['throughput']:9.1f} req/s "
+        + f"p50 {summary['p50'] * 1000:8.1f}ms p95 {summary['p95'] * 1000:8.1f}ms p99 {summary['p99'] * 1000:8.1f}ms "
+        + f"upstream {stand_in.calls} ({summary['upstream_errors']} failed)",
+    )
+    if args.verbose:
+        print(json.dumps(metrics, indent=2))
+    return summary
+
+
+def _compare(
+    results: dict[str, dict[str, typing.Any]],
+    baseline: dict[str, dict[str, typing.Any]],
+    tolerance: float,
+) -> list[str]:
+    regressions: list[str] = []
+    for name, summary in results.items():
+        for metric, direction in REGRESSION_METRICS.items():
+            if name not in baseline or not baseline[name].get(metric):
+                continue
+            change = (summary[metric] - baseline[name][metric]) / baseline[name][metric]
+            if change * direction > tolerance:
+                regressions.append(
+                    f"{name} {metric} {baseline[name][metric]:.4f} -> {summary[metric]:.4f} ({change:+.1%})",
+                )
+    return regressions
+
+
+def _setup_argparser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="benchmarks",
+        description="Fetch endpoint load test against local GitHub/BitBucket stand-ins",
+    )
+    parser.add_argument(
+        "--scenario",
+        metavar="NAME",
+        action="append",
+        choices=SCENARIOS.keys(),
+        help=f"Scenario to run, may be specified multiple times, {', '.join(SCENARIOS.keys())}",
+    )
+    parser.add_argument("--duration", metavar="SECONDS", type=float, default=10, help="Duration of each scenario")
+    parser.add_argument("--concurrency", metavar="N", type=int, default=8, help="Concurrent clients")
+    parser.add_argument("--changes", metavar="N", type=int, default=50, help="Distinct changes polled")
+    parser.add_argument("--seed", metavar="N", type=int, default=0, help="Random seed")
+    parser.add_argument(
+        "--latency", metavar="DIST", help="Upstream latency, fixed:S uniform:A,B exponential:MEAN lognormal:MU,SIGMA"
+    )
+    parser.add_argument("--error-rate", metavar="RATE", type=float, help="Upstream error rate")
+    parser.add_argument("--payload-padding", metavar="BYTES", type=int, help="Upstream payload padding per run")
+    parser.add_argument("--runs", metavar="N", type=int, help="Upstream runs per response")
+    parser.add_argument("--baseline", metavar="FILE", help="Baseline to compare with")
+    parser.add_argument("--save-baseline", metavar="FILE", help="Save results as baseline")
+    parser.add_argument("--tolerance", metavar="RATIO", type=float, default=0.1, help="Allowed regression ratio")
+    parser.add_argument("--verbose", action="store_true", help="Print server log and metrics")
+    return parser
+
+
+def main() -> None:
+    args = _setup_argparser().parse_args()
+
+    results = {name: _run_scenario(name, SCENARIOS[name], args) for name in args.scenario or SCENARIOS.keys()}
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as output:
+            json.dump(results, output, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as baseline:
+            regressions = _compare(results, json.load(baseline), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+import dataclasses
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+
+
+@dataclasses.dataclass
+class Result:
+    duration: float = 0
+    errors: int = 0
+    empty: int = 0
+    latencies: list[float] = dataclasses.field(default_factory=list)
+    lock: threading.Lock = dataclasses.field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def summary(self) -> dict[str, float]:
+        latencies = sorted(self.latencies)
+        requests = len(latencies) + self.errors
+        return {
+            "requests": requests,
+            "errors": self.errors,
+            "empty": self.empty,
+            "throughput": len(latencies) / self.duration if self.duration else 0,
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+        }
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def _worker(
+    url: str,
+    end: float,
+    changes: int,
+    seed: int,
+    result: Result,
+) -> None:
+    rand = random.Random(seed)
+    while time.monotonic() < end:
+        change = rand.randrange(changes)
+        body = json.dumps(
+            {
+                "project": f"project{change % 5}",
+                "changeId": 1000 + change,
+                "revision": 1 + change % 3,
+            },
+        ).encode("utf8")
+        started = time.monotonic()
+        try:
+            with urllib.request.urlopen(
+                urllib.request.Request(
+                    url,
+                    data=body,
+                    headers={
+                        "Accept": "application/json",
+                        "Content-Type": "application/json",
+                    },
+                ),
+                timeout=30,
+            ) as response:
+                runs = json.loads(response.read()).get("runs")
+            with result.lock:
+                result.latencies.append(time.monotonic() - started)
+                #
+                # Upstream failures without cached results
+                # are answered without the driver runs
+                #
+                if not runs:
+                    result.empty += 1
+        except (urllib.error.URLError, OSError, ValueError):
+            with result.lock:
+                result.errors += 1
+
+
+def run(url: str, concurrency: int, duration: float, changes: int, seed: int = 0) -> Result:
+    result = Result()
+    started = time.monotonic()
+    threads = [
+        threading.Thread(
+            target=_worker,
+            args=(url, started + duration, changes, seed + i, result),
+        )
+        for i in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    result.duration = time.monotonic() - started
+    return result
+
+
+__all__ = [
+    "Result",
+    "percentile",
+    "run",
+]
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+import dataclasses
+import functools
+import gzip
+import hashlib
+import http.server
+import json
+import random
+import re
+import threading
+import time
+import typing
+import urllib.parse
+import zlib
+
+from gerrit_checks_mock_fetch_endpoint import latency
+
+GITHUB_RE: typing.Final = re.compile(r"^/repos/(?P<space>[^/]+)/(?P<repo>[^/]+)/actions/runs$")
+BITBUCKET_RE: typing.Final = re.compile(r"^/2.0/repositories/(?P<space>[^/]+)/(?P<repo>[^/]+)/pipelines/$")
+
+
+def _run_id(branch: str, index: int) -> int:
+    return zlib.crc32(f"{branch}/{index}".encode("utf8"))
+
+
+@dataclasses.dataclass
+class StandInConfig:  # pylint: disable=too-many-instance-attributes
+    latency: str = "fixed:0"
+    runs: int = 5
+    payload_padding: int = 2048
+    error_rate: float = 0.0
+    rate_limit: int = 5000
+    #
+    # The drivers do not send If-None-Match,
+    # the ETag behavior is not exercised yet
+    #
+    etag: bool = True
+    gzip: bool = True
+    seed: int = 0
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    def __init__(
+        self,
+        *args: typing.Any,
+        standin: "StandIn",
+        **kwargs: typing.Any,
+    ):
+        self._standin = standin
+        http.server.BaseHTTPRequestHandler.__init__(self, *args, **kwargs)
+
+    def log_message(self, format: str, *args: typing.Any) -> None:  # pylint: disable=redefined-builtin
+        pass
+
+    def do_GET(self) -> None:  # pylint: disable=invalid-name
+        url = urllib.parse.urlparse(self.path)
+        query = urllib.parse.parse_qs(url.query)
+
+        status, delay = self._standin.next_call()
+        time.sleep(delay)
+
+        github = GITHUB_RE.match(url.path)
+        bitbucket = BITBUCKET_RE.match(url.path)
+        if status != 200 or not (github or bitbucket):
+            self.send_error(status if status != 200 else 404)
+            return
+
+        if github:
+            payload = self._standin.github(query.get("branch", [""])[0])
+        else:
+            payload = self._standin.bitbucket(query.get("target.branch", [""])[0])
+        body = json.dumps(payload).encode("utf8")
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'  # nosec
+
+        config = self._standin.config
+        not_modified = config.etag and self.headers["If-None-Match"] == etag
+        self.send_response(304 if not_modified else 200)
+        self.send_header("X-RateLimit-Limit", str(config.rate_limit))
+        self.send_header("X-RateLimit-Remaining", str(self._standin.rate_limit_remaining()))
+        if config.etag:
+            self.send_header("ETag", etag)
+        if not_modified:
+            self.end_headers()
+            return
+        if config.gzip and "gzip" in (self.headers["Accept-Encoding"] or ""):
+            body = gzip.compress(body)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class StandIn:
+    def __init__(self, config: StandInConfig):
+        self.config = config
+        self._random = random.Random(config.seed)
+        self._latency = latency.sampler(config.latency)
+        self._lock = threading.Lock()
+        self._calls = 0
+        self._server = http.server.ThreadingHTTPServer(
+            ("127.0.0.1", 0),
+            functools.partial(_Handler, standin=self),
+        )
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    @property
+    def calls(self) -> int:
+        return self._calls
+
+    def next_call(self) -> tuple[int, float]:
+        with self._lock:
+            self._calls += 1
+            failed = self._random.random() < self.config.error_rate
+            return (503 if failed else 200), self._latency(self._random)
+
+    def rate_limit_remaining(self) -> int:
+        return max(0, self.config.rate_limit - self._calls)
+
+    def github(self, branch: str) -> dict[str, typing.Any]:
+        return {
+            "total_count": self.config.runs,
+            "workflow_runs": [
+                {
+                    "id": _run_id(branch, i),
+                    "name": f"Workflow {i}",
+                    "path": f".github/workflows/workflow{i}.yml",
+                    "head_branch": branch,
+                    "status": "completed",
+                    "conclusion": "success" if i % 3 else "failure",
+                    "run_attempt": 1,
+                    "html_url": f"https://github.com/space/repo/actions/runs/{i}",
+                    "updated_at": "2022-01-01T00:00:00Z",
+                    "pull_requests": [],
+                    "repository": {"description": "x" * self.config.payload_padding},
+                    "head_repository": {"description": "x" * self.config.payload_padding},
+                }
+                for i in range(self.config.runs)
+            ],
+        }
+
+    def bitbucket(self, branch: str) -> dict[str, typing.Any]:
+        return {
+            "pagelen": 100,
+            "values": [
+                {
+                    "type": "pipeline",
+                    "uuid": f"{{{_run_id(branch, i)}}}",
+                    "run_number": 1,
+                    "build_number": i,
+                    "state": {
+                        "type": "pipeline_state_completed",
+                        "name": "COMPLETED",
+                        "result": {
+                            "type": "pipeline_state_completed_successful",
+                            "name": "SUCCESSFUL",
+                        },
+                    },
+                    "repository": {
+                        "links": {"html": {"href": "https://bitbucket.org/space/repo"}},
+                        "description": "x" * self.config.payload_padding,
+                    },
+                    "target": {"ref_name": branch},
+                }
+                for i in range(self.config.runs)
+            ],
+        }
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+__all__ = [
+    "StandIn",
+    "StandInConfig",
+]
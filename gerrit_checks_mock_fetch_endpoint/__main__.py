@@ -2,27 +2,38 @@
 import argparse
 import configparser
 import functools
+import gzip
+import hashlib
 import http.server
 import importlib.metadata
-import io
 import json
 import logging
 import pathlib
+import queue
 import re
 import signal
+import tempfile
 import threading
 import typing
 import urllib.parse
 import urllib.request
 
 from . import (
-    checks,
+    admission,
     driver,
     driver_bitbucket,
     driver_github,
+    driver_replay,
     driver_sandbox,
     fetch_endpoint,
+    lifecycle,
+    log,
+    prewarm,
+    recording,
+    result_cache,
+    tracing,
 )
+from .metrics import METRICS
 
 LOG_LEVELS: typing.Dict[str, int] = {
     "CRITICAL": logging.CRITICAL,
@@ -40,6 +51,7 @@ DRIVERS: typing.Final[dict[str, typing.Type[driver.DriverBase]]] = {
     "github": driver_github.Driver,
     "bitbucket": driver_bitbucket.Driver,
     "sandbox": driver_sandbox.Driver,
+    "replay": driver_replay.Driver,
 }
 
 
@@ -50,71 +62,360 @@ class HTTPError(RuntimeError):
         self.code = code
 
 
+class Runtime(typing.NamedTuple):
+    config: configparser.ConfigParser
+    drivers: list[driver.DriverBase]
+
+
+class Reloader:  # pylint: disable=too-few-public-methods
+    def __init__(
+        self,
+        args: argparse.Namespace,
+        results: result_cache.ResultCache,
+        runtime: Runtime,
+    ):
+        self._args = args
+        self._results = results
+        self._lock = threading.Lock()
+        self._logger = logging.getLogger("gerrit_checks_mock_fetch_endpoint")
+        self.runtime = runtime
+
+    def reload(self) -> None:
+        with self._lock:
+            self._logger.info("Reloading configuration")
+            try:
+                config = _load_config(self._args.config)
+                drivers = _create_drivers(config, self.runtime)
+            except Exception:  # pylint: disable=broad-except
+                self._logger.error("Cannot reload configuration, keeping current", exc_info=True)
+                return
+
+            for _driver in drivers:
+                if _driver not in self.runtime.drivers:
+                    self._logger.info("Driver '%s' (re)created", _driver.name)
+            for _driver in self.runtime.drivers:
+                if _driver not in drivers:
+                    self._results.discard(_driver.name, _driver.generation)
+
+            self.runtime = Runtime(config=config, drivers=drivers)
+            self._logger.setLevel(_log_level(self._args, config["main"]))
+            self._logger.debug("Config: %r", dict(((x, dict(y)) for x, y in config.items())))
+
+
+def _etag_match(if_none_match: typing.Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+
+    #
+    # Weak comparison, see RFC-9110 section 8.8.3.2
+    #
+    opaque = etag.removeprefix("W/")
+    return any(x.removeprefix("W/") == opaque for x in SPLIT_COMMA_RE.split(if_none_match.strip()))
+
+
+def _accepts_gzip(accept_encoding: typing.Optional[str]) -> bool:
+    for coding in SPLIT_COMMA_RE.split((accept_encoding or "").strip()):
+        name, _, params = coding.partition(";")
+        if name.strip().lower() == "gzip":
+            _, _, qvalue = params.partition("q=")
+            try:
+                return float(qvalue or 1) > 0
+            except ValueError:
+                return False
+    return False
+
+
+def _collect(
+    drivers: list[driver.DriverBase],
+    results: result_cache.ResultCache,
+    request: fetch_endpoint.FetchEndpoint,
+    deadline: driver.Deadline,
+    ttl: typing.Optional[float] = None,
+) -> tuple[list[result_cache.Entry], bool]:
+    #
+    # Returns the entries and whether all drivers answered in time,
+    # drivers which did not are answered from stale results if any
+    #
+    logger = logging.getLogger("gerrit_checks_mock_fetch_endpoint")
+    entries: list[result_cache.Entry] = []
+    fresh = True
+    for _driver in drivers:
+        key = (_driver.name, _driver.generation, request["project"], request["changeId"], request["revision"])
+        entry = results.get(key)
+        if entry is None and deadline.expired():
+            #
+            # Out of time, answer with what we have
+            #
+            logger.warning("Request deadline exceeded, skipping driver '%s'", _driver.name)
+            METRICS.increment("fetch.deadline_exceeded")
+        elif entry is None:
+            try:
+                with tracing.span("driver", driver=_driver.name):
+                    runs = _driver.run(request, deadline)
+                if deadline.expired():
+                    #
+                    # Runs collected past the deadline may be partial,
+                    # prefer the last complete results
+                    #
+                    METRICS.increment("fetch.deadline_exceeded")
+                    entry = results.get(key, stale=True) or results.put(
+                        key,
+                        runs,
+                        store=False,
+                        fragments=_driver.encode(runs),
+                    )
+                    fresh = False
+                else:
+                    entry = results.put(key, runs, ttl=ttl, fragments=_driver.encode(runs))
+            except Exception as e:  # pylint: disable=broad-except, invalid-name
+                #
+                # A failure is not a result, do not cache it
+                # and keep serving the last known runs
+                #
+                if isinstance(e, driver.UpstreamError):
+                    logger.warning("Driver '%s' failed: %s", _driver.name, e)
+                else:
+                    logger.error("Driver '%s' failed", _driver.name, exc_info=True)
+                METRICS.increment("fetch.driver_errors")
+        if entry is None:
+            fresh = False
+            entry = results.get(key, stale=True)
+        if entry is not None:
+            entries.append(entry)
+
+    return entries, fresh
+
+
+def _cached(
+    drivers: list[driver.DriverBase],
+    results: result_cache.ResultCache,
+    request: fetch_endpoint.FetchEndpoint,
+    stale: bool,
+) -> typing.Optional[list[result_cache.Entry]]:
+    entries: list[result_cache.Entry] = []
+    for _driver in drivers:
+        entry = results.get(
+            (_driver.name, _driver.generation, request["project"], request["changeId"], request["revision"]),
+            stale=stale,
+        )
+        if entry is None:
+            return None
+        entries.append(entry)
+    return entries
+
+
+def _answer(
+    drivers: list[driver.DriverBase],
+    results: result_cache.ResultCache,
+    admission_control: admission.Admission,
+    request: fetch_endpoint.FetchEndpoint,
+    deadline: driver.Deadline,
+) -> typing.Optional[tuple[list[result_cache.Entry], bool]]:
+    #
+    # Returns the entries and whether they are fresh, or None
+    # when shed. Only requests which need upstream calls
+    # wait for an admission slot.
+    #
+    cached = _cached(drivers, results, request, stale=False)
+    if cached is not None:
+        METRICS.increment("admission.cached")
+        return cached, True
+
+    with admission_control.admit(deadline.remaining()) as admitted:
+        if admitted:
+            return _collect(drivers, results, request, deadline)
+
+    cached = _cached(drivers, results, request, stale=True)
+    if cached is None:
+        return None
+    METRICS.increment("admission.shed_from_cache")
+    return cached, False
+
+
+def _final(entries: list[result_cache.Entry], fresh: bool) -> bool:
+    #
+    # Only a non empty set of completed runs is final for each driver,
+    # an empty set may be a workflow which is not started yet.
+    # Stale or missing results are never final.
+    #
+    return fresh and bool(entries) and all(entry.fragments and entry.completed for entry in entries)
+
+
 class MyServer(http.server.BaseHTTPRequestHandler):
     def __init__(
         self,
         *args: typing.Any,
-        drivers: list[driver.DriverBase],
+        reloader: Reloader,
+        results: result_cache.ResultCache,
+        admission_control: admission.Admission,
+        lifecycle_control: lifecycle.Lifecycle,
+        prewarmer: typing.Optional[prewarm.Prewarmer],
         **kwargs: typing.Any,
     ):
-        self._drivers = drivers
+        #
+        # Requests keep the runtime they started with,
+        # a reload affects only new requests
+        #
+        runtime = reloader.runtime
+        self._drivers = runtime.drivers
+        self._config = runtime.config["main"]
+        self._results = results
+        self._admission = admission_control
+        self._lifecycle = lifecycle_control
+        self._prewarmer = prewarmer
         self._logger = logging.getLogger("gerrit_checks_mock_fetch_endpoint")
         http.server.BaseHTTPRequestHandler.__init__(self, *args, **kwargs)
 
     def log_message(self, format: str, *args: typing.Any) -> None:  # pylint: disable=redefined-builtin
         self._logger.debug("msg: " + format, *args)
 
+    def _deadline(self) -> driver.Deadline:
+        timeout = self._config.getfloat("request_timeout", 5)
+        try:
+            timeout = min(timeout, float(self.headers["X-Request-Timeout"] or timeout))
+        except ValueError:
+            self._logger.warning("Invalid X-Request-Timeout header '%s'", self.headers["X-Request-Timeout"])
+        return driver.Deadline(timeout)
+
+    def _send_unavailable(self, message: str) -> None:
+        self.send_response(503, message)
+        self.send_header("Retry-After", str(self._config.getint("retry_after", 1)))
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _send_json(self, body: bytes, headers: dict[str, str], code: int = 200) -> None:
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json; charset=UTF-8")
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header("Vary", "Accept-Encoding")
+        if _accepts_gzip(self.headers["Accept-Encoding"]) and len(body) >= self._config.getint(
+            "compress_min_size", 1024
+        ):
+            compressed = gzip.compress(body, compresslevel=self._config.getint("compress_level", 6))
+            METRICS.increment("response.gzip_responses")
+            METRICS.increment("response.bytes_saved", len(body) - len(compressed))
+            body = compressed
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        METRICS.increment("response.bytes_sent", len(body))
+
+    def _fetch(self) -> None:
+        if self.headers["Accept"] != "application/json":
+            raise HTTPError(500, "Invalid accept header")
+        if self.headers["Content-Type"] != "application/json":
+            raise HTTPError(500, "Invalid content-type")
+        if "Content-Length" not in self.headers:
+            raise HTTPError(500, "No content")
+
+        with tracing.span("read"):
+            request = typing.cast(
+                fetch_endpoint.FetchEndpoint,
+                json.loads(
+                    self.rfile.read(int(self.headers["Content-Length"])).decode(
+                        "utf8",
+                    ),
+                ),
+            )
+
+        self._logger.debug("request %s", log.Payload(request))
+        tracing.tag(project=request["project"], changeId=request["changeId"], revision=request["revision"])
+
+        answer = _answer(self._drivers, self._results, self._admission, request, self._deadline())
+        if answer is None:
+            self._logger.warning("Overloaded, shedding request %s", log.Payload(request))
+            self._send_unavailable("Overloaded")
+            return
+        entries, fresh = answer
+
+        body = result_cache.assemble(entries)
+        etag = f'W/"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+        if _final(entries, fresh):
+            max_age = self._config.getint("cache_max_age_completed", 300)
+        else:
+            max_age = self._config.getint("cache_max_age", 0)
+
+        with tracing.span("write"):
+            if _etag_match(self.headers["If-None-Match"], etag):
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Cache-Control", f"max-age={max_age}")
+                self.end_headers()
+                self._logger.debug("response not modified etag=%s", etag)
+                return
+
+            self._send_json(
+                body,
+                {
+                    "ETag": etag,
+                    "Cache-Control": f"max-age={max_age}",
+                },
+            )
+
+        self._logger.debug("response %s", log.Payload(body))
+
+    def _events(self) -> None:
+        if self._prewarmer is None:
+            raise HTTPError(403, "Not found")
+        if "Content-Length" not in self.headers:
+            raise HTTPError(500, "No content")
+
+        #
+        # A single event or a stream-events style
+        # sequence of one event per line
+        #
+        for line in self.rfile.read(int(self.headers["Content-Length"])).decode("utf8", "replace").splitlines():
+            self._prewarmer.ingest(line)
+
+        self.send_response(204)
+        self.end_headers()
+
     def do_HEAD(self) -> None:  # pylint: disable=invalid-name
         self.send_error(500, "Unsupported")
 
     def do_GET(self) -> None:  # pylint: disable=invalid-name
-        self.send_error(500, "Unsupported")
+        url = urllib.parse.urlparse(self.path)
+        if url.path == "/metrics":
+            self._send_json(json.dumps(METRICS.snapshot()).encode("utf8"), {})
+        elif url.path == "/health":
+            if self._lifecycle.draining:
+                self._send_json(
+                    json.dumps({"status": "draining"}).encode("utf8"),
+                    {"Retry-After": str(self._config.getint("retry_after", 1))},
+                    code=503,
+                )
+            else:
+                self._send_json(json.dumps({"status": "ok"}).encode("utf8"), {})
+        else:
+            self.send_error(500, "Unsupported")
 
     def do_POST(self) -> None:  # pylint: disable=invalid-name
         try:
             url = urllib.parse.urlparse(self.path)
             if url.path == "/fetch":
-                if self.headers["Accept"] != "application/json":
-                    raise HTTPError(500, "Invalid accept header")
-                if self.headers["Content-Type"] != "application/json":
-                    raise HTTPError(500, "Invalid content-type")
-                if "Content-Length" not in self.headers:
-                    raise HTTPError(500, "No content")
-
-                request = typing.cast(
-                    fetch_endpoint.FetchEndpoint,
-                    json.loads(
-                        self.rfile.read(int(self.headers["Content-Length"])).decode(
-                            "utf8",
-                        ),
-                    ),
-                )
-
-                self._logger.debug("request %s", request)
-
-                runs: list[checks.CheckRun] = []
-                for _driver in self._drivers:
-                    runs.extend(_driver.run(request))
-
-                response: checks.FetchResponse = checks.FetchResponse(  # type: ignore  # until python-3.11
-                    responseCode=checks.ResponseCode.OK,
-                    runs=runs,
-                )
-
-                self.send_response(200)
-                self.send_header("Content-Type", "application/json; charset=UTF-8")
-                self.end_headers()
-                self.send_response(200)
-                response_wrapper = io.TextIOWrapper(self.wfile, write_through=True)
-
+                with self._lifecycle.request() as accepted, tracing.trace(
+                    self.headers["X-Request-Id"],
+                    slow_threshold=self._config.getfloat("slow_request_threshold", 0),
+                    profile_rate=self._config.getfloat("profile_rate", 0),
+                    profile_dir=self._config.get("profile_dir", tempfile.gettempdir()),
+                ):
+                    if accepted:
+                        self._fetch()
+                    else:
+                        self._send_unavailable("Draining")
+            elif url.path == "/events":
                 #
-                # Avoid double close
+                # The prewarmer is stopped by the drain
                 #
-                setattr(response_wrapper, "close", lambda: None)
-
-                json.dump(response, response_wrapper)
-
-                self._logger.debug("response %s", response)
+                if self._lifecycle.draining:
+                    self._send_unavailable("Draining")
+                else:
+                    self._events()
             else:
                 raise HTTPError(403, "Not found")
 
@@ -178,10 +479,17 @@ def _setup_argparser(
     return parser
 
 
+def _log_level(
+    args: argparse.Namespace,
+    config: configparser.SectionProxy,
+) -> int:
+    return LOG_LEVELS.get(args.log_level or config.get("log_level", ""), logging.INFO)
+
+
 def _setup_log(
     args: argparse.Namespace,
     config: configparser.SectionProxy,
-) -> None:
+) -> typing.Optional[log.QueueListener]:
     handler = logging.StreamHandler()
     log_file = args.log_file or config.get("log_file")
     if log_file:
@@ -201,36 +509,45 @@ def _setup_log(
             ),
         ),
     )
-    logging.getLogger(None).addHandler(handler)
+    handler.addFilter(log.PayloadFilter(config.getint("log_payload_size", 4096)))
+
+    #
+    # Request threads only enqueue, formatting and
+    # writing are done by the listener thread
+    #
+    listener = None
+    log_queue_size = config.getint("log_queue_size", 0)
+    if log_queue_size > 0:
+        log_queue: queue.Queue[logging.LogRecord] = queue.Queue(log_queue_size)
+        listener = log.QueueListener(log_queue, handler, respect_handler_level=True)
+        listener.start()
+        logging.getLogger(None).addHandler(log.QueueHandler(log_queue))
+    else:
+        logging.getLogger(None).addHandler(handler)
 
     logger = logging.getLogger("gerrit_checks_mock_fetch_endpoint")
-    logger.setLevel(LOG_LEVELS.get(args.log_level or config.get("log_level"), logging.INFO))
+    logger.setLevel(_log_level(args, config))
 
+    return listener
 
-def main() -> None:
-    try:
-        distribution = importlib.metadata.distribution(
-            "gerrit_checks_mock_fetch_endpoint",
-        )
-    except importlib.metadata.PackageNotFoundError:
-        distribution = importlib.metadata.PathDistribution(path=pathlib.Path())
 
-    args = _setup_argparser(distribution).parse_args()
+def _load_config(config_files: list[str]) -> configparser.ConfigParser:
     config = configparser.ConfigParser()
-    for config_file in args.config:
+    for config_file in config_files:
         config.read(config_file)
+    return config
 
-    _setup_log(args, config["main"])
-    logger = logging.getLogger("gerrit_checks_mock_fetch_endpoint")
-
-    logger.info("Startup, version=%s", distribution.version)
-    logger.debug("Args: %r", args)
-    logger.debug("Config: %r", dict(((x, dict(y)) for x, y in config.items())))
 
+def _create_drivers(
+    config: configparser.ConfigParser,
+    previous: typing.Optional[Runtime],
+) -> list[driver.DriverBase]:
     driver_names = config["main"].get("drivers")
     if not driver_names:
         raise RuntimeError("Please specify 'drivers' in configuration")
 
+    previous_drivers = {x.name: x for x in previous.drivers} if previous else {}
+
     drivers: list[driver.DriverBase] = []
     for driver_name in SPLIT_COMMA_RE.split(driver_names.strip()):
         driver_class: typing.Optional[typing.Type[driver.DriverBase]] = DRIVERS.get(
@@ -238,21 +555,128 @@ def main() -> None:
         )
         if not driver_class:
             raise RuntimeError(f"Unsupported driver '{driver_name}'")
-        drivers.append(driver_class(name=driver_name, config=config[driver_name]))
 
-    server = http.server.HTTPServer(
+        #
+        # Keep drivers whose configuration did not change,
+        # with their connections and caches
+        #
+        previous_driver = previous_drivers.get(driver_name)
+        if (
+            previous is not None
+            and previous_driver is not None
+            and isinstance(previous_driver, driver_class)
+            and dict(previous.config[driver_name]) == dict(config[driver_name])
+        ):
+            drivers.append(previous_driver)
+        else:
+            drivers.append(driver_class(name=driver_name, config=config[driver_name]))
+
+    return drivers
+
+
+def _create_prewarm(
+    config: configparser.SectionProxy,
+    reloader: Reloader,
+    results: result_cache.ResultCache,
+    admission_control: admission.Admission,
+) -> tuple[typing.Optional[prewarm.Prewarmer], typing.Optional[prewarm.StreamEvents]]:
+    if not config.getboolean("prewarm", False):
+        return None, None
+
+    def warm(request: fetch_endpoint.FetchEndpoint) -> None:
+        runtime = reloader.runtime
+        deadline = driver.Deadline(runtime.config["main"].getfloat("request_timeout", 5))
+        #
+        # User requests come first
+        #
+        with admission_control.admit(deadline.remaining()) as admitted:
+            if not admitted:
+                METRICS.increment("prewarm.shed")
+                return
+            _collect(runtime.drivers, results, request, deadline, ttl=config.getfloat("prewarm_ttl", 60))
+
+    prewarmer = prewarm.Prewarmer(
+        delay=config.getfloat("prewarm_delay", 10),
+        workers=config.getint("prewarm_workers", 2),
+        max_pending=config.getint("prewarm_max_pending", 1000),
+        warm=warm,
+    )
+    stream_events = None
+    if config.get("prewarm_stream_events"):
+        stream_events = prewarm.StreamEvents(
+            command=config["prewarm_stream_events"],
+            prewarmer=prewarmer,
+            retry_delay=config.getfloat("prewarm_stream_events_retry", 10),
+        )
+    return prewarmer, stream_events
+
+
+def main() -> None:
+    try:
+        distribution = importlib.metadata.distribution(
+            "gerrit_checks_mock_fetch_endpoint",
+        )
+    except importlib.metadata.PackageNotFoundError:
+        distribution = importlib.metadata.PathDistribution(path=pathlib.Path())
+
+    args = _setup_argparser(distribution).parse_args()
+    config = _load_config(args.config)
+
+    log_listener = _setup_log(args, config["main"])
+    logger = logging.getLogger("gerrit_checks_mock_fetch_endpoint")
+
+    logger.info("Startup, version=%s", distribution.version)
+    logger.debug("Args: %r", args)
+    logger.debug("Config: %r", dict(((x, dict(y)) for x, y in config.items())))
+
+    results = result_cache.ResultCache(
+        max_bytes=config["main"].getint("result_cache_size", 64 * 1024 * 1024),
+        ttl=config["main"].getfloat("result_cache_ttl", 5),
+        ttl_completed=config["main"].getfloat("result_cache_ttl_completed", 60),
+    )
+    server_lifecycle = lifecycle.Lifecycle()
+    reloader = Reloader(
+        args=args,
+        results=results,
+        runtime=Runtime(config=config, drivers=_create_drivers(config, None)),
+    )
+    admission_control = admission.Admission(
+        max_in_flight=config["main"].getint("max_in_flight", 16),
+        max_queue_wait=config["main"].getfloat("max_queue_wait", 0.5),
+    )
+    prewarmer, stream_events = _create_prewarm(config["main"], reloader, results, admission_control)
+
+    server = http.server.ThreadingHTTPServer(
         (
             args.bind_address or config["main"].get("bind_address", ""),
             args.bind_port or config["main"].getint("bind_port", 8080),
         ),
         functools.partial(
             MyServer,
-            drivers=drivers,
+            reloader=reloader,
+            results=results,
+            admission_control=admission_control,
+            lifecycle_control=server_lifecycle,
+            prewarmer=prewarmer,
         ),
     )
 
+    def drain() -> None:
+        logger.info("Draining")
+        if not server_lifecycle.drain(
+            delay=reloader.runtime.config["main"].getfloat("drain_delay", 0),
+            timeout=reloader.runtime.config["main"].getfloat("drain_timeout", 10),
+        ):
+            logger.warning("Drain timeout, aborting requests in progress")
+        if stream_events is not None:
+            stream_events.stop()
+        if prewarmer is not None:
+            prewarmer.stop()
+        server.shutdown()
+
     def shutdown() -> None:
-        threading.Thread(target=server.shutdown).start()
+        if not server_lifecycle.draining:
+            threading.Thread(target=drain).start()
 
     signal.signal(
         signal.SIGTERM,
@@ -262,6 +686,10 @@ def main() -> None:
         signal.SIGINT,
         lambda x, y: shutdown(),
     )
+    signal.signal(
+        signal.SIGHUP,
+        lambda x, y: threading.Thread(target=reloader.reload).start(),
+    )
 
     try:
         server.serve_forever()
@@ -269,6 +697,12 @@ def main() -> None:
         server.shutdown()
     server.server_close()
 
+    recording.close()
+    logger.info("Shutdown")
+    if log_listener is not None:
+        log_listener.stop()
+    logging.shutdown()
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+import contextlib
+import threading
+import typing
+
+from .metrics import METRICS
+
+
+class Admission:  # pylint: disable=too-few-public-methods
+    def __init__(self, max_in_flight: int, max_queue_wait: float):
+        self._semaphore = threading.BoundedSemaphore(max_in_flight)
+        self._max_queue_wait = max_queue_wait
+        self._lock = threading.Lock()
+        self._in_flight = 0
+
+    def _update(self, delta: int) -> None:
+        with self._lock:
+            self._in_flight += delta
+            METRICS.set("admission.in_flight", self._in_flight)
+
+    @contextlib.contextmanager
+    def admit(self, timeout: float) -> typing.Iterator[bool]:
+        if not self._semaphore.acquire(timeout=min(self._max_queue_wait, timeout)):
+            METRICS.increment("admission.shed")
+            yield False
+            return
+
+        METRICS.increment("admission.admitted")
+        self._update(1)
+        try:
+            yield True
+        finally:
+            self._update(-1)
+            self._semaphore.release()
+
+
+__all__ = [
+    "Admission",
+]
@@ -1,15 +1,41 @@
 # -*- coding: utf-8 -*-
 import abc
+import collections
 import configparser
+import email.message
+import functools
+import itertools
 import json
 import logging
+import threading
+import time
 import typing
+import urllib.error
 import urllib.request
+import zlib
 
-from . import checks, fetch_endpoint
+from . import (
+    checks,
+    fetch_endpoint,
+    hedging,
+    log,
+    projection,
+    recording,
+    result_cache,
+    tracing,
+)
+from .metrics import METRICS
 
 T = typing.TypeVar("T")
 
+CHUNK_SIZE: typing.Final = 65536
+
+#
+# Describe the body on the wire, not the decoded body
+# kept in records
+#
+WIRE_HEADERS: typing.Final = frozenset(("content-encoding", "content-length", "transfer-encoding"))
+
 
 def non_none(var: typing.Optional[T]) -> T:
     if var is None:
@@ -17,15 +43,68 @@ def non_none(var: typing.Optional[T]) -> T:
     return var
 
 
-class DriverBase(abc.ABC):  # pylint: disable=too-few-public-methods
+def _headers(headers: email.message.Message) -> dict[str, str]:
+    return {k.lower(): v for k, v in headers.items() if k.lower() not in WIRE_HEADERS}
+
+
+class Deadline:
+    def __init__(self, timeout: float):
+        self._expires = time.monotonic() + timeout
+
+    def remaining(self) -> float:
+        return max(0.0, self._expires - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() == 0
+
+
+#
+# Raised by drivers when the upstream cannot be queried,
+# as opposed to having no runs
+#
+class UpstreamError(RuntimeError):
+    pass
+
+
+class Translation(typing.NamedTuple):
+    run: checks.CheckRun
+    fragment: bytes
+
+
+Transport = typing.Callable[
+    [str, dict[str, str], float, Deadline, typing.Optional[threading.Event]],
+    recording.Record,
+]
+
+
+#
+# Every driver instance has its own generation so that results
+# of a driver replaced by a reload are never served by the new one
+#
+_generations = itertools.count()
+
+
+class DriverBase(abc.ABC):  # pylint: disable=too-few-public-methods, too-many-instance-attributes
 
     _logger: logging.Logger
     _config: configparser.SectionProxy
 
     def __init__(self, name: str, config: configparser.SectionProxy):
         self._name = name
+        self._generation = next(_generations)
         self._config = config
         self._timeout = config.getfloat("timeout", 2)
+        self._translation_cache_size = config.getint("translation_cache_size", 4096)
+        self._translation_cache: collections.OrderedDict[typing.Hashable, Translation] = collections.OrderedDict()
+        #
+        # The cached translations by run identity, to find
+        # the encoded fragment of the runs returned by run()
+        #
+        self._translations: dict[int, Translation] = {}
+        self._translation_cache_lock = threading.Lock()
+        self._hedging = hedging.Hedging(name, config) if config.getboolean("hedge", False) else None
+        self._transport: Transport = self._http_transport
+        self._recorder = recording.recorder(config["record_file"]) if config.get("record_file") else None
 
         self._logger = logging.getLogger(f"gerrit_checks_mock_fetch_endpoint.{name}")
 
@@ -38,30 +117,184 @@ class DriverBase(abc.ABC):  # pylint: disable=too-few-public-methods
     def __repr__(self) -> str:
         return self._name
 
-    def _json_fetcher(self, url: str, headers: dict[str, str]) -> typing.Optional[typing.Any]:
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def _json_fetcher(
+        self,
+        url: str,
+        headers: dict[str, str],
+        deadline: Deadline,
+        fields: typing.Optional[projection.Projection] = None,
+    ) -> typing.Any:
+        timeout = min(self._timeout, deadline.remaining())
+        if timeout == 0:
+            self._logger.warning("Request deadline exceeded, not fetching from '%s'", self._name)
+            METRICS.increment(f"upstream.{self._name}.deadline_exceeded")
+            raise UpstreamError("Request deadline exceeded")
         try:
-            self._logger.debug("fetch url=%s timeout=%s", url, self._timeout)
-            with self._opener.open(
-                urllib.request.Request(url, headers=headers),
-                timeout=self._timeout,
-            ) as fetcher:
-                resp = typing.cast(typing.Any, json.load(fetcher))
-                self._logger.debug("resp data=%s", resp)
-                return resp
+            self._logger.debug("fetch url=%s timeout=%s", url, timeout)
+            with tracing.span("upstream", driver=self._name):
+                if self._hedging is None:
+                    data = self._fetch(url, headers, timeout, deadline, None)
+                else:
+                    data = self._hedging.call(
+                        functools.partial(self._fetch, url, headers, timeout, deadline),
+                        timeout,
+                    )
+            with tracing.span("decode", driver=self._name):
+                resp = typing.cast(
+                    typing.Any,
+                    json.loads(data) if fields is None else projection.loads(data, fields),
+                )
+            self._logger.debug("resp data=%s", log.Payload(resp))
+            return resp
         except Exception as e:  # pylint: disable=broad-except, invalid-name
             self._logger.error("Cannot communicate with '%s': %s", self._name, e)
             self._logger.debug("Exception", exc_info=True)
-            return None
+            METRICS.increment(f"upstream.{self._name}.errors")
+            raise UpstreamError(f"Cannot communicate with '{self._name}': {e}") from e
+
+    def _fetch(  # pylint: disable=too-many-arguments
+        self,
+        url: str,
+        headers: dict[str, str],
+        timeout: float,
+        deadline: Deadline,
+        cancelled: typing.Optional[threading.Event],
+    ) -> bytes:
+        record = self._transport(url, headers, timeout, deadline, cancelled)
+        if self._recorder is not None:
+            self._recorder.record(record)
+        if self._hedging is not None:
+            self._hedging.observe(record.latency, record.headers.get("x-ratelimit-remaining"))
+        if record.status != 200:
+            raise RuntimeError(f"HTTP Error {record.status}")
+        return record.body
+
+    def _read(
+        self,
+        fetcher: typing.Any,
+        deadline: Deadline,
+        cancelled: typing.Optional[threading.Event],
+    ) -> bytes:
+        #
+        # Decode while reading so that the compressed
+        # and the decompressed content are never held together.
+        #
+        decoder = zlib.decompressobj(16 + zlib.MAX_WBITS) if fetcher.headers.get("Content-Encoding") == "gzip" else None
+        wire = 0
+        chunks: list[bytes] = []
+        while chunk := fetcher.read(CHUNK_SIZE):
+            if deadline.expired():
+                raise TimeoutError("Request deadline exceeded")
+            if cancelled is not None and cancelled.is_set():
+                raise RuntimeError("Fetch cancelled")
+            wire += len(chunk)
+            chunks.append(decoder.decompress(chunk) if decoder else chunk)
+        if decoder:
+            chunks.append(decoder.flush())
+        data = b"".join(chunks)
+        METRICS.increment(f"upstream.{self._name}.bytes_received", wire)
+        if decoder:
+            METRICS.increment(f"upstream.{self._name}.gzip_responses")
+            METRICS.increment(f"upstream.{self._name}.bytes_saved", len(data) - wire)
+        return data
+
+    def _http_transport(  # pylint: disable=too-many-arguments
+        self,
+        url: str,
+        headers: dict[str, str],
+        timeout: float,
+        deadline: Deadline,
+        cancelled: typing.Optional[threading.Event],
+    ) -> recording.Record:
+        started = time.monotonic()
+        try:
+            with self._opener.open(
+                urllib.request.Request(
+                    url,
+                    headers={**headers, "Accept-Encoding": "gzip"},
+                ),
+                timeout=timeout,
+            ) as fetcher:
+                status = fetcher.status
+                response_headers = _headers(fetcher.headers)
+                data = self._read(fetcher, deadline, cancelled)
+        except urllib.error.HTTPError as e:  # pylint: disable=invalid-name
+            with e:
+                status = e.code
+                response_headers = _headers(e.headers)
+                data = self._read(e, deadline, cancelled)
+        return recording.Record(
+            url=url,
+            status=status,
+            headers=response_headers,
+            body=data,
+            latency=time.monotonic() - started,
+        )
+
+    def set_transport(self, transport: Transport) -> None:
+        self._transport = transport
+
+    def _translate(
+        self,
+        key: typing.Hashable,
+        translator: typing.Callable[[], checks.CheckRun],
+    ) -> checks.CheckRun:
+        with self._translation_cache_lock:
+            translation = self._translation_cache.get(key)
+            if translation is not None:
+                self._translation_cache.move_to_end(key)
+        if translation is not None:
+            METRICS.increment(f"translation.{self._name}.hits")
+            return translation.run
+
+        METRICS.increment(f"translation.{self._name}.misses")
+        run = translator()
+        translation = Translation(run, result_cache.encode_run(run))
+        with self._translation_cache_lock:
+            previous = self._translation_cache.pop(key, None)
+            if previous is not None:
+                del self._translations[id(previous.run)]
+            self._translation_cache[key] = translation
+            self._translations[id(run)] = translation
+            while len(self._translation_cache) > self._translation_cache_size:
+                _, evicted = self._translation_cache.popitem(last=False)
+                del self._translations[id(evicted.run)]
+        return run
+
+    def encode(self, runs: list[checks.CheckRun]) -> tuple[bytes, ...]:
+        #
+        # Unchanged runs reuse the fragment encoded
+        # when they were translated
+        #
+        with self._translation_cache_lock:
+            translations = [self._translations.get(id(run)) for run in runs]
+        return tuple(
+            translation.fragment if translation is not None and translation.run is run else result_cache.encode_run(run)
+            for run, translation in zip(runs, translations)
+        )
 
     @abc.abstractmethod
     def run(
         self,
         request: fetch_endpoint.FetchEndpoint,
+        deadline: Deadline,
     ) -> list[checks.CheckRun]:
         pass
 
 
 __all__ = [
     "non_none",
+    "Deadline",
+    "Translation",
+    "Transport",
+    "UpstreamError",
     "DriverBase",
 ]
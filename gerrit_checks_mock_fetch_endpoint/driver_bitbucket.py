@@ -2,10 +2,11 @@
 # pylint: disable=duplicate-code
 import base64
 import configparser
+import functools
 import typing
 import urllib.parse
 
-from . import checks, driver, fetch_endpoint
+from . import checks, driver, fetch_endpoint, tracing
 
 
 class StatusInfo(typing.TypedDict):
@@ -88,6 +89,23 @@ class Driver(driver.DriverBase):  # pylint: disable=too-few-public-methods
         ),
     }
 
+    BITBUCKET_PIPELINES_FIELDS: typing.Final = {
+        "values": {
+            "build_number": None,
+            "repository": {
+                "links": {
+                    "html": {
+                        "href": None,
+                    },
+                },
+            },
+            "run_number": None,
+            "state": None,
+            "type": None,
+            "uuid": None,
+        },
+    }
+
     def __init__(self, name: str, config: configparser.SectionProxy):
         super().__init__(name, config)
 
@@ -113,6 +131,7 @@ class Driver(driver.DriverBase):  # pylint: disable=too-few-public-methods
     def run(
         self,
         request: fetch_endpoint.FetchEndpoint,
+        deadline: driver.Deadline,
     ) -> list[checks.CheckRun]:
         pipelines = self._json_fetcher(
             url=f"{self._base_url}/{{project}}/pipelines/?{{query}}".format(
@@ -127,80 +146,106 @@ class Driver(driver.DriverBase):  # pylint: disable=too-few-public-methods
                         ),
                         "sort": "-created_on",
                         "pagelen": 100,
+                        "fields": ",".join(
+                            (
+                                "values.build_number",
+                                "values.repository.links.html.href",
+                                "values.run_number",
+                                "values.state",
+                                "values.type",
+                                "values.uuid",
+                            ),
+                        ),
                     },
                 ),
             ),
             headers=self._headers,
+            deadline=deadline,
+            fields=self.BITBUCKET_PIPELINES_FIELDS,
         )
 
         ret: list[checks.CheckRun] = []
 
-        for pipeline in pipelines["values"] if pipelines else ():
-
-            cstate = self.BITBUCKET_PIPELINE_STATE.get(
-                pipeline["state"]["type"],
-                StatusInfo(
-                    status=checks.RunStatus.COMPLETED,
-                    tags=(
-                        checks.Tag(
-                            name="UNKNOWN",
-                            tooltip=f"Unknown state {pipeline['state']['type']}",
-                            color=checks.TagColor.PURPLE,
+        with tracing.span("translate", driver=self._name):
+            for pipeline in pipelines["values"] if pipelines else ():
+                state = pipeline["state"]
+                result_o = state.get("result") or state.get("stage")
+                ret.append(
+                    self._translate(
+                        (
+                            pipeline["uuid"],
+                            pipeline["run_number"],
+                            pipeline["build_number"],
+                            state["type"],
+                            state["name"],
+                            result_o["type"],
+                            result_o["name"],
                         ),
+                        functools.partial(self._translate_run, pipeline),
+                    ),
+                )
+
+        return ret
+
+    def _translate_run(self, pipeline: dict[str, typing.Any]) -> checks.CheckRun:
+        cstate: typing.Optional[StatusInfo] = self.BITBUCKET_PIPELINE_STATE.get(pipeline["state"]["type"])
+        if cstate is None:
+            cstate = StatusInfo(
+                status=checks.RunStatus.COMPLETED,
+                tags=(
+                    checks.Tag(
+                        name="UNKNOWN",
+                        tooltip=f"Unknown state {pipeline['state']['type']}",
+                        color=checks.TagColor.PURPLE,
                     ),
                 ),
             )
 
-            result_o = pipeline["state"].get("result") or pipeline["state"].get("stage")
-            result = result_o["type"]
-            if result is None:
+        result_o = pipeline["state"].get("result") or pipeline["state"].get("stage")
+        result = result_o["type"]
+        if result is None:
+            cresult: typing.Optional[ConclusionInfo] = ConclusionInfo(
+                category=checks.Category.INFO,
+                tags=(),
+            )
+        else:
+            cresult = self.BITBUCKET_PIPELINE_RESULT.get(result)
+            if cresult is None:
                 cresult = ConclusionInfo(
-                    category=checks.Category.INFO,
-                    tags=(),
-                )
-            else:
-                cresult = self.BITBUCKET_PIPELINE_RESULT.get(
-                    result,
-                    ConclusionInfo(
-                        category=checks.Category.WARNING,
-                        tags=(
-                            checks.Tag(
-                                name="UNKNOWN",
-                                tooltip=f"Unknown conclusion {result}",
-                                color=checks.TagColor.PURPLE,
-                            ),
+                    category=checks.Category.WARNING,
+                    tags=(
+                        checks.Tag(
+                            name="UNKNOWN",
+                            tooltip=f"Unknown conclusion {result}",
+                            color=checks.TagColor.PURPLE,
                         ),
                     ),
                 )
 
-            ret.append(
-                checks.CheckRun(  # type: ignore  # until python-3.11
-                    attempt=pipeline["run_number"],
-                    checkName=f"cm:bb:{pipeline['type']}",
-                    status=cstate["status"],
-                    results=(
-                        checks.CheckRun(
-                            category=cresult["category"],
-                            summary=f"Workflow {pipeline['type']}",
-                            message=(f"state={pipeline['state']['name']}\n" + f"result={result_o['name']}"),
-                            tags=cstate["tags"] + cresult["tags"],
-                            links=(
-                                checks.Link(
-                                    url=(
-                                        f"{pipeline['repository']['links']['html']['href']}/"
-                                        + f"pipelines/results/{pipeline['build_number']}"
-                                    ),
-                                    tooltop="BitBucket pipeline page",
-                                    primary=True,
-                                    icon=checks.LinkIcon.EXTERNAL,
-                                ),
+        return checks.CheckRun(  # type: ignore  # until python-3.11
+            attempt=pipeline["run_number"],
+            checkName=f"cm:bb:{pipeline['type']}",
+            status=cstate["status"],
+            results=(
+                checks.CheckRun(
+                    category=cresult["category"],
+                    summary=f"Workflow {pipeline['type']}",
+                    message=(f"state={pipeline['state']['name']}\n" + f"result={result_o['name']}"),
+                    tags=cstate["tags"] + cresult["tags"],
+                    links=(
+                        checks.Link(
+                            url=(
+                                f"{pipeline['repository']['links']['html']['href']}/"
+                                + f"pipelines/results/{pipeline['build_number']}"
                             ),
+                            tooltop="BitBucket pipeline page",
+                            primary=True,
+                            icon=checks.LinkIcon.EXTERNAL,
                         ),
                     ),
                 ),
-            )
-
-        return ret
+            ),
+        )
 
 
 __all__ = [
@@ -1,10 +1,11 @@
 # -*- coding: utf-8 -*-
 # pylint: disable=duplicate-code
 import configparser
+import functools
 import typing
 import urllib.parse
 
-from . import checks, driver, fetch_endpoint
+from . import checks, driver, fetch_endpoint, tracing
 
 
 class StatusInfo(typing.TypedDict):
@@ -110,6 +111,19 @@ class Driver(driver.DriverBase):  # pylint: disable=too-few-public-methods
         ),
     }
 
+    GITHUB_RUNS_FIELDS: typing.Final = {
+        "workflow_runs": {
+            "conclusion": None,
+            "html_url": None,
+            "id": None,
+            "name": None,
+            "path": None,
+            "run_attempt": None,
+            "status": None,
+            "updated_at": None,
+        },
+    }
+
     def __init__(self, name: str, config: configparser.SectionProxy):
         super().__init__(name, config)
 
@@ -130,6 +144,7 @@ class Driver(driver.DriverBase):  # pylint: disable=too-few-public-methods
     def run(
         self,
         request: fetch_endpoint.FetchEndpoint,
+        deadline: driver.Deadline,
     ) -> list[checks.CheckRun]:
         workflow_runs = self._json_fetcher(
             url=f"{self._base_url}/{{repo}}/actions/runs?{{query}}".format(
@@ -142,80 +157,87 @@ class Driver(driver.DriverBase):  # pylint: disable=too-few-public-methods
                             f"{self._branch_prefix}{request['changeId'] % 100:02}/"
                             + f"{request['changeId']}/{request['revision']}"
                         ),
+                        "exclude_pull_requests": "true",
                     },
                 ),
             ),
             headers=self._headers,
+            deadline=deadline,
+            fields=self.GITHUB_RUNS_FIELDS,
         )
 
         ret: list[checks.CheckRun] = []
 
-        for workflow_run in workflow_runs["workflow_runs"] if workflow_runs else ():
+        with tracing.span("translate", driver=self._name):
+            for workflow_run in workflow_runs["workflow_runs"] if workflow_runs else ():
+                ret.append(
+                    self._translate(
+                        (workflow_run["id"], workflow_run["run_attempt"], workflow_run["updated_at"]),
+                        functools.partial(self._translate_run, workflow_run),
+                    ),
+                )
 
-            cstatus = self.GITHUB_RUN_STATUS.get(
-                workflow_run["status"],
-                StatusInfo(
-                    status=checks.RunStatus.COMPLETED,
-                    tags=(
-                        checks.Tag(
-                            name="UNKNOWN",
-                            tooltip=f"Unknown status {workflow_run['status']}",
-                            color=checks.TagColor.PURPLE,
-                        ),
+        return ret
+
+    def _translate_run(self, workflow_run: dict[str, typing.Any]) -> checks.CheckRun:
+        cstatus: typing.Optional[StatusInfo] = self.GITHUB_RUN_STATUS.get(workflow_run["status"])
+        if cstatus is None:
+            cstatus = StatusInfo(
+                status=checks.RunStatus.COMPLETED,
+                tags=(
+                    checks.Tag(
+                        name="UNKNOWN",
+                        tooltip=f"Unknown status {workflow_run['status']}",
+                        color=checks.TagColor.PURPLE,
                     ),
                 ),
             )
 
-            conclusion = workflow_run["conclusion"]
-            if conclusion is None:
+        conclusion = workflow_run["conclusion"]
+        if conclusion is None:
+            cconclusion: typing.Optional[ConclusionInfo] = ConclusionInfo(
+                category=checks.Category.INFO,
+                tags=(),
+            )
+        else:
+            cconclusion = self.GITHUB_RUN_CONCLUSION.get(conclusion)
+            if cconclusion is None:
                 cconclusion = ConclusionInfo(
-                    category=checks.Category.INFO,
-                    tags=(),
-                )
-            else:
-                cconclusion = self.GITHUB_RUN_CONCLUSION.get(
-                    conclusion,
-                    ConclusionInfo(
-                        category=checks.Category.WARNING,
-                        tags=(
-                            checks.Tag(
-                                name="UNKNOWN",
-                                tooltip=f"Unknown conclusion {conclusion}",
-                                color=checks.TagColor.PURPLE,
-                            ),
+                    category=checks.Category.WARNING,
+                    tags=(
+                        checks.Tag(
+                            name="UNKNOWN",
+                            tooltip=f"Unknown conclusion {conclusion}",
+                            color=checks.TagColor.PURPLE,
                         ),
                     ),
                 )
 
-            ret.append(
-                checks.CheckRun(  # type: ignore  # until python-3.11
-                    attempt=workflow_run["run_attempt"],
-                    checkName=f"cm:gh:{workflow_run['name']}",
-                    status=cstatus["status"],
-                    results=(
-                        checks.CheckRun(
-                            category=cconclusion["category"],
-                            summary=f"Workflow {workflow_run['name']}",
-                            message=(
-                                f"status={workflow_run['status']}\n"
-                                + f"conclusion={workflow_run['conclusion']}\n"
-                                + f"Workflow {workflow_run['path']}"
-                            ),
-                            tags=cstatus["tags"] + cconclusion["tags"],
-                            links=(
-                                checks.Link(
-                                    url=workflow_run["html_url"],
-                                    tooltop="GitHub action page",
-                                    primary=True,
-                                    icon=checks.LinkIcon.EXTERNAL,
-                                ),
-                            ),
+        return checks.CheckRun(  # type: ignore  # until python-3.11
+            attempt=workflow_run["run_attempt"],
+            checkName=f"cm:gh:{workflow_run['name']}",
+            status=cstatus["status"],
+            results=(
+                checks.CheckRun(
+                    category=cconclusion["category"],
+                    summary=f"Workflow {workflow_run['name']}",
+                    message=(
+                        f"status={workflow_run['status']}\n"
+                        + f"conclusion={workflow_run['conclusion']}\n"
+                        + f"Workflow {workflow_run['path']}"
+                    ),
+                    tags=cstatus["tags"] + cconclusion["tags"],
+                    links=(
+                        checks.Link(
+                            url=workflow_run["html_url"],
+                            tooltop="GitHub action page",
+                            primary=True,
+                            icon=checks.LinkIcon.EXTERNAL,
                         ),
                     ),
                 ),
-            )
-
-        return ret
+            ),
+        )
 
 
 __all__ = [
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+import collections
+import configparser
+import threading
+import time
+import typing
+
+from . import checks, driver, driver_bitbucket, driver_github, fetch_endpoint, recording
+from .metrics import METRICS
+
+REPLAY_DRIVERS: typing.Final[dict[str, typing.Type[driver.DriverBase]]] = {
+    "github": driver_github.Driver,
+    "bitbucket": driver_bitbucket.Driver,
+}
+
+
+class Driver(driver.DriverBase):  # pylint: disable=too-few-public-methods
+    def __init__(self, name: str, config: configparser.SectionProxy):
+        super().__init__(name=name, config=config)
+
+        driver_class = REPLAY_DRIVERS.get(config.get("driver", ""))
+        if driver_class is None:
+            raise RuntimeError(f"Unsupported replay driver '{config.get('driver')}'")
+
+        timing = config.get("timing", "original")
+        if timing not in ("original", "none"):
+            raise RuntimeError(f"Unsupported replay timing '{timing}'")
+        self._original_timing = timing == "original"
+
+        #
+        # Requests are matched by their scrubbed url,
+        # repeated requests cycle through the recorded responses
+        #
+        self._records: dict[str, collections.deque[recording.Record]] = collections.defaultdict(collections.deque)
+        for record in recording.load(config["file"]):
+            self._records[record.url].append(record)
+        self._records_lock = threading.Lock()
+
+        self._driver = driver_class(name=name, config=config)
+        self._driver.set_transport(self._replay)
+
+    def _replay(  # pylint: disable=too-many-arguments, unused-argument
+        self,
+        url: str,
+        headers: dict[str, str],
+        timeout: float,
+        deadline: driver.Deadline,
+        cancelled: typing.Optional[threading.Event],
+    ) -> recording.Record:
+        key = recording.scrub_url(url)
+        with self._records_lock:
+            records = self._records.get(key)
+            if not records:
+                METRICS.increment(f"replay.{self._name}.misses")
+                raise RuntimeError(f"No recorded response for '{key}'")
+            record = records[0]
+            records.rotate(-1)
+        METRICS.increment(f"replay.{self._name}.hits")
+
+        if self._original_timing:
+            if record.latency > timeout:
+                time.sleep(timeout)
+                raise TimeoutError("Replayed request timed out")
+            if cancelled is not None:
+                if cancelled.wait(record.latency):
+                    raise RuntimeError("Fetch cancelled")
+            else:
+                time.sleep(record.latency)
+        return record
+
+    def run(
+        self,
+        request: fetch_endpoint.FetchEndpoint,
+        deadline: driver.Deadline,
+    ) -> list[checks.CheckRun]:
+        return self._driver.run(request, deadline)
+
+    def encode(self, runs: list[checks.CheckRun]) -> tuple[bytes, ...]:
+        return self._driver.encode(runs)
+
+
+__all__ = [
+    "Driver",
+]
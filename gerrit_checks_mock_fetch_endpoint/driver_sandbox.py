@@ -1,13 +1,133 @@
 # -*- coding: utf-8 -*-
+import collections
+import configparser
+import hashlib
+import random
+import threading
+import time
+import typing
 
-from . import checks, driver, fetch_endpoint
+from . import checks, driver, fetch_endpoint, latency
+from .metrics import METRICS
 
+CALLS_SIZE: typing.Final = 65536
+
+
+class Driver(driver.DriverBase):  # pylint: disable=too-few-public-methods, too-many-instance-attributes
+    def __init__(self, name: str, config: configparser.SectionProxy):
+        super().__init__(name, config)
+
+        #
+        # Without runs keep the original demo output
+        #
+        self._synthetic = "runs" in config
+        self._runs = config.getint("runs", 2)
+        self._results = config.getint("results", 2)
+        self._tags = config.getint("tags", 1)
+        self._links = config.getint("links", 1)
+        self._message_size = config.getint("message_size", 64)
+        self._failure_rate = config.getfloat("failure_rate", 0)
+        self._seed = config.getint("seed", 0)
+        self._latency = latency.sampler(config.get("latency", "fixed:0"))
+        #
+        # Number of calls per change, so that repeated
+        # polls of a change do not all fail alike
+        #
+        self._calls: collections.OrderedDict[tuple[str, int, int], int] = collections.OrderedDict()
+        self._calls_lock = threading.Lock()
 
-class Driver(driver.DriverBase):  # pylint: disable=too-few-public-methods
     def run(
         self,
         request: fetch_endpoint.FetchEndpoint,
+        deadline: driver.Deadline,
     ) -> list[checks.CheckRun]:
+        if not self._synthetic:
+            return self._demo()
+
+        key = (request["project"], request["changeId"], request["revision"])
+        with self._calls_lock:
+            call = self._calls.pop(key, 0)
+            self._calls[key] = call + 1
+            while len(self._calls) > CALLS_SIZE:
+                self._calls.popitem(last=False)
+
+        #
+        # The outcome depends only on the seed, the change and
+        # the number of its previous calls, not on other changes
+        #
+        rand = self._random(request, call)
+        delay = self._latency(rand)
+        failed = rand.random() < self._failure_rate
+
+        timeout = min(self._timeout, deadline.remaining())
+        if delay > timeout:
+            time.sleep(timeout)
+            METRICS.increment(f"sandbox.{self._name}.timeouts")
+            raise driver.UpstreamError("Simulated timeout")
+        time.sleep(delay)
+        if failed:
+            METRICS.increment(f"sandbox.{self._name}.failures")
+            raise driver.UpstreamError("Simulated failure")
+
+        return self._generate(request)
+
+    def _random(self, request: fetch_endpoint.FetchEndpoint, *salt: int) -> random.Random:
+        #
+        # hash() is salted per process so use a stable digest
+        #
+        digest = hashlib.blake2b(
+            "/".join(
+                str(x) for x in (self._seed, request["project"], request["changeId"], request["revision"], *salt)
+            ).encode("utf8"),
+            digest_size=8,
+        ).digest()
+        return random.Random(int.from_bytes(digest, "big"))
+
+    def _generate(self, request: fetch_endpoint.FetchEndpoint) -> list[checks.CheckRun]:
+        #
+        # Content depends only on the seed and the change
+        #
+        rand = self._random(request)
+
+        def text(prefix: str, size: int) -> str:
+            return f"{prefix} " + "".join(rand.choices("abcdefghijklmnopqrstuvwxyz ", k=size))
+
+        return [
+            checks.CheckRun(  # type: ignore  # until python-3.11
+                checkName=f"cm:sb:Checks Mock - Check{run}",
+                checkDescription=f"Description{run}",
+                status=checks.RunStatus.COMPLETED,
+                statusLink="https://www.google.com",
+                results=[
+                    checks.CheckResult(
+                        category=rand.choice(list(checks.Category)),
+                        summary=f"Summary{result}",
+                        message=text(f"Message{result}", self._message_size),
+                        tags=[
+                            checks.Tag(
+                                name=f"Name{tag}",
+                                tooltip=f"Tip{tag}",
+                                color=rand.choice(list(checks.TagColor)),
+                            )
+                            for tag in range(self._tags)
+                        ],
+                        links=[
+                            checks.Link(
+                                url=f"https://www.google.com/search?q={rand.getrandbits(32):08x}",
+                                tooltip=f"Tip{link}",
+                                primary=link == 0,
+                                icon=rand.choice(list(checks.LinkIcon)),
+                            )
+                            for link in range(self._links)
+                        ],
+                    )
+                    for result in range(self._results)
+                ],
+            )
+            for run in range(self._runs)
+        ]
+
+    def _demo(self) -> list[checks.CheckRun]:
         return [
             checks.CheckRun(  # type: ignore  # until python-3.11
                 checkName="cm:sb:Checks Mock - Check1",
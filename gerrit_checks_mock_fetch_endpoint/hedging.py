@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+import collections
+import concurrent.futures
+import configparser
+import threading
+import typing
+
+from .metrics import METRICS
+
+T = typing.TypeVar("T")
+
+
+class Hedging:  # pylint: disable=too-many-instance-attributes
+    def __init__(self, name: str, config: configparser.SectionProxy):
+        self._name = name
+        self._percentile = config.getfloat("hedge_percentile", 95)
+        self._min_delay = config.getfloat("hedge_min_delay", 0.05)
+        self._min_samples = config.getint("hedge_min_samples", 20)
+        self._ratio = config.getfloat("hedge_ratio", 0.05)
+        self._burst = config.getfloat("hedge_burst", 10)
+        self._rate_limit_reserve = config.getint("hedge_rate_limit_reserve", 100)
+
+        self._lock = threading.Lock()
+        self._samples: collections.deque[float] = collections.deque(maxlen=config.getint("hedge_samples", 200))
+        self._tokens = self._burst
+        self._rate_limit_remaining: typing.Optional[int] = None
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=config.getint("hedge_workers", 32),
+            thread_name_prefix=f"{name}-hedge",
+        )
+
+    def observe(self, latency: float, rate_limit_remaining: typing.Optional[str]) -> None:
+        with self._lock:
+            self._samples.append(latency)
+            if rate_limit_remaining is not None and rate_limit_remaining.isdigit():
+                self._rate_limit_remaining = int(rate_limit_remaining)
+
+    def _delay(self) -> typing.Optional[float]:
+        with self._lock:
+            #
+            # Every request earns a fraction of a hedge,
+            # this bounds hedges to a ratio of the requests
+            #
+            self._tokens = min(self._burst, self._tokens + self._ratio)
+            if len(self._samples) < self._min_samples:
+                return None
+            samples = sorted(self._samples)
+        return max(
+            self._min_delay,
+            samples[min(len(samples) - 1, int(len(samples) * self._percentile / 100))],
+        )
+
+    def _available(self) -> bool:
+        if self._rate_limit_remaining is not None and self._rate_limit_remaining <= self._rate_limit_reserve:
+            METRICS.increment(f"hedge.{self._name}.rate_limited")
+            return False
+        if self._tokens < 1:
+            METRICS.increment(f"hedge.{self._name}.throttled")
+            return False
+        return True
+
+    def _acquire(self) -> bool:
+        with self._lock:
+            if not self._available():
+                return False
+            self._tokens -= 1
+            return True
+
+    def call(
+        self,
+        attempt: typing.Callable[[threading.Event], T],
+        timeout: float,
+    ) -> T:
+        cancelled = threading.Event()
+        delay = self._delay()
+        if delay is None or delay >= timeout:
+            return attempt(cancelled)
+
+        #
+        # Without a hedge to send there is nothing to wait for,
+        # keep the call in this thread and out of the pool
+        #
+        with self._lock:
+            available = self._available()
+        if not available:
+            return attempt(cancelled)
+
+        first = self._executor.submit(attempt, cancelled)
+        concurrent.futures.wait((first,), timeout=delay)
+        if first.done() or not self._acquire():
+            return first.result()
+
+        METRICS.increment(f"hedge.{self._name}.sent")
+        second = self._executor.submit(attempt, cancelled)
+        try:
+            pending = {first, second}
+            while True:
+                done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    if future.exception() is None:
+                        if future is second:
+                            METRICS.increment(f"hedge.{self._name}.won")
+                        return future.result()
+                if not pending:
+                    return first.result()
+        finally:
+            #
+            # The loser is cancelled, if already running
+            # it stops at its next read
+            #
+            cancelled.set()
+            second.cancel()
+
+
+__all__ = [
+    "Hedging",
+]
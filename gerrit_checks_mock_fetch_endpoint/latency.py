@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+import random
+import typing
+
+Sampler = typing.Callable[[random.Random], float]
+
+
+#
+# Parameter count and check of each distribution,
+# so that a bad spec fails when the config is loaded
+#
+_PARAMS: typing.Final[dict[str, tuple[int, typing.Callable[[list[float]], bool]]]] = {
+    "fixed": (1, lambda v: v[0] >= 0),
+    "uniform": (2, lambda v: 0 <= v[0] <= v[1]),
+    "exponential": (1, lambda v: v[0] > 0),
+    "lognormal": (2, lambda v: v[1] >= 0),
+}
+
+
+def sampler(spec: str) -> Sampler:
+    name, _, params = spec.partition(":")
+    values = [float(x) for x in params.split(",") if x]
+    distributions: dict[str, Sampler] = {
+        "fixed": lambda r: values[0],
+        "uniform": lambda r: r.uniform(values[0], values[1]),
+        "exponential": lambda r: r.expovariate(1 / values[0]),
+        "lognormal": lambda r: r.lognormvariate(values[0], values[1]),
+    }
+    if name not in distributions:
+        raise ValueError(f"Unsupported latency distribution '{name}'")
+    count, valid = _PARAMS[name]
+    if len(values) != count or not valid(values):
+        raise ValueError(f"Invalid latency distribution '{spec}'")
+    return distributions[name]
+
+
+__all__ = [
+    "Sampler",
+    "sampler",
+]
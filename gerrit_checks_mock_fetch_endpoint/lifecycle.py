@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+import contextlib
+import threading
+import time
+import typing
+
+from .metrics import METRICS
+
+
+class Lifecycle:
+    def __init__(self) -> None:
+        self._condition = threading.Condition()
+        self._in_flight = 0
+        self._draining = False
+        self._refusing = False
+
+    @property
+    def draining(self) -> bool:
+        return self._draining
+
+    @contextlib.contextmanager
+    def request(self) -> typing.Iterator[bool]:
+        with self._condition:
+            accepted = not self._refusing
+            if accepted:
+                self._in_flight += 1
+        if not accepted:
+            METRICS.increment("lifecycle.refused")
+            yield False
+            return
+
+        try:
+            yield True
+        finally:
+            with self._condition:
+                self._in_flight -= 1
+                self._condition.notify_all()
+
+    def drain(self, delay: float, timeout: float) -> bool:
+        #
+        # Report draining first so that a load balancer
+        # stops sending requests before we refuse them
+        #
+        self._draining = True
+        time.sleep(delay)
+        with self._condition:
+            self._refusing = True
+            return self._condition.wait_for(lambda: self._in_flight == 0, timeout)
+
+
+__all__ = [
+    "Lifecycle",
+]
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+import logging
+import logging.handlers
+import queue
+import reprlib
+import typing
+
+from .metrics import METRICS
+
+
+#
+# Marks a log argument which may be large,
+# bounded by PayloadFilter when emitted
+#
+class Payload:  # pylint: disable=too-few-public-methods
+    __slots__ = ("value",)
+
+    def __init__(self, value: typing.Any):
+        self.value = value
+
+    def __str__(self) -> str:
+        return str(self.value)
+
+
+class PayloadFilter(logging.Filter):  # pylint: disable=too-few-public-methods
+    def __init__(self, limit: int):
+        super().__init__()
+        self._limit = limit
+        self._repr = reprlib.Repr()
+        self._repr.maxlevel = 4
+        self._repr.maxdict = self._repr.maxlist = self._repr.maxtuple = 32
+        self._repr.maxstring = self._repr.maxother = limit
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        #
+        # Format only what is emitted, up to the limit
+        #
+        if self._limit > 0 and isinstance(record.args, tuple):
+            record.args = tuple(self._bounded(arg.value) if isinstance(arg, Payload) else arg for arg in record.args)
+        return True
+
+    def _bounded(self, value: typing.Any) -> str:
+        #
+        # Slice large bodies before formatting them,
+        # reprlib does not bound bytes
+        #
+        if isinstance(value, (str, bytes, bytearray)) and len(value) > self._limit:
+            head = value[: self._limit]
+            return f"{head if isinstance(head, str) else repr(head)}... ({len(value) - self._limit} more)"
+        text = value if isinstance(value, str) else self._repr.repr(value)
+        if len(text) > self._limit:
+            text = f"{text[:self._limit]}... ({len(text) - self._limit} more)"
+        return text
+
+
+class QueueHandler(logging.handlers.QueueHandler):
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            METRICS.increment("log.dropped")
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        #
+        # The listener runs in process, leave the
+        # formatting to its thread
+        #
+        return record
+
+
+class QueueListener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self) -> None:
+        #
+        # Wait for room so that records already queued are written
+        #
+        self.queue.put(self._sentinel)  # type: ignore
+
+
+__all__ = [
+    "Payload",
+    "PayloadFilter",
+    "QueueHandler",
+    "QueueListener",
+]
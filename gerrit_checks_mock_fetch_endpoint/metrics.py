@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+import threading
+import typing
+
+
+class Metrics:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._values: dict[str, int] = {}
+
+    def increment(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self._values[name] = self._values.get(name, 0) + value
+
+    def set(self, name: str, value: int) -> None:
+        with self._lock:
+            self._values[name] = value
+
+    def snapshot(self) -> dict[str, int]:
+        with self._lock:
+            return dict(sorted(self._values.items()))
+
+
+METRICS: typing.Final = Metrics()
+
+
+__all__ = [
+    "METRICS",
+    "Metrics",
+]
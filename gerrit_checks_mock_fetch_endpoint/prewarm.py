@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+import concurrent.futures
+import heapq
+import itertools
+import json
+import logging
+import shlex
+import subprocess  # nosec
+import threading
+import time
+import typing
+
+from . import fetch_endpoint
+from .metrics import METRICS
+
+Key = tuple[str, int, int]
+
+
+def from_event(event: dict[str, typing.Any]) -> typing.Optional[fetch_endpoint.FetchEndpoint]:
+    if event.get("type") != "patchset-created":
+        return None
+    return typing.cast(
+        fetch_endpoint.FetchEndpoint,
+        {
+            "project": event["change"]["project"],
+            "changeId": int(event["change"]["number"]),
+            "revision": int(event["patchSet"]["number"]),
+        },
+    )
+
+
+class Prewarmer:  # pylint: disable=too-many-instance-attributes
+    def __init__(
+        self,
+        delay: float,
+        workers: int,
+        max_pending: int,
+        warm: typing.Callable[[fetch_endpoint.FetchEndpoint], None],
+    ):
+        self._delay = delay
+        self._max_pending = max_pending
+        self._warm = warm
+        self._logger = logging.getLogger("gerrit_checks_mock_fetch_endpoint.prewarm")
+        self._condition = threading.Condition()
+        self._pending: list[tuple[float, int, fetch_endpoint.FetchEndpoint]] = []
+        self._pending_keys: set[Key] = set()
+        self._sequence = itertools.count()
+        self._stopped = False
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=workers,
+            thread_name_prefix="prewarm",
+        )
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def schedule(self, request: fetch_endpoint.FetchEndpoint) -> None:
+        key = (request["project"], request["changeId"], request["revision"])
+        with self._condition:
+            if key in self._pending_keys:
+                return
+            if len(self._pending) >= self._max_pending:
+                METRICS.increment("prewarm.dropped")
+                return
+            heapq.heappush(self._pending, (time.monotonic() + self._delay, next(self._sequence), request))
+            self._pending_keys.add(key)
+            self._condition.notify()
+        METRICS.increment("prewarm.scheduled")
+        self._logger.debug("Scheduled prewarm of %s", key)
+
+    def ingest(self, line: str) -> None:
+        #
+        # Invalid events are counted and skipped
+        #
+        if not line.strip():
+            return
+        try:
+            request = from_event(json.loads(line))
+        except (ValueError, KeyError, TypeError, AttributeError):
+            METRICS.increment("prewarm.invalid_events")
+            self._logger.warning("Invalid event '%s'", line.strip())
+            return
+        if request is not None:
+            self.schedule(request)
+
+    def _run(self) -> None:
+        #
+        # Wait for the replication to push the branch
+        # and for the workflow to start
+        #
+        with self._condition:
+            while not self._stopped:
+                if not self._pending:
+                    self._condition.wait()
+                    continue
+                due, _, request = self._pending[0]
+                if due > time.monotonic():
+                    self._condition.wait(due - time.monotonic())
+                    continue
+                heapq.heappop(self._pending)
+                self._pending_keys.discard((request["project"], request["changeId"], request["revision"]))
+                self._executor.submit(self._fetch, request)
+
+    def _fetch(self, request: fetch_endpoint.FetchEndpoint) -> None:
+        try:
+            self._warm(request)
+            METRICS.increment("prewarm.fetched")
+        except Exception:  # pylint: disable=broad-except
+            METRICS.increment("prewarm.errors")
+            self._logger.error("Cannot prewarm %s", request, exc_info=True)
+
+    def stop(self) -> None:
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class StreamEvents:  # pylint: disable=too-few-public-methods
+    def __init__(self, command: str, prewarmer: Prewarmer, retry_delay: float):
+        self._command = shlex.split(command)
+        self._prewarmer = prewarmer
+        self._retry_delay = retry_delay
+        self._logger = logging.getLogger("gerrit_checks_mock_fetch_endpoint.prewarm")
+        self._stopped = threading.Event()
+        self._process: typing.Optional[subprocess.Popen[str]] = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _consume(self, process: "subprocess.Popen[str]") -> None:
+        assert process.stdout is not None  # nosec
+        for line in process.stdout:
+            self._prewarmer.ingest(line)
+
+    def _run(self) -> None:
+        #
+        # Reconnect whenever the stream ends
+        #
+        while not self._stopped.is_set():
+            self._logger.info("Starting stream events '%s'", shlex.join(self._command))
+            try:
+                with subprocess.Popen(  # nosec
+                    self._command,
+                    stdin=subprocess.DEVNULL,
+                    stdout=subprocess.PIPE,
+                    encoding="utf-8",
+                ) as process:
+                    self._process = process
+                    self._consume(process)
+                self._logger.warning("Stream events exited with %s", process.returncode)
+            except OSError:
+                self._logger.error("Cannot run stream events", exc_info=True)
+            self._stopped.wait(self._retry_delay)
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._process is not None and self._process.poll() is None:
+            self._process.terminate()
+
+
+__all__ = [
+    "Prewarmer",
+    "StreamEvents",
+    "from_event",
+]
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+import json
+import json.decoder
+import re
+import typing
+
+#
+# A projection maps object keys to be kept into the projection of
+# their value, None keeps the whole value. A projection of an array
+# applies to each of its elements.
+#
+# The document is scanned incrementally, values which are not
+# projected are decoded and dropped one at a time so that the
+# complete document is never held as objects.
+#
+Projection = typing.Mapping[str, typing.Optional["Projection"]]
+
+_DECODER: typing.Final = json.JSONDecoder()
+_WHITESPACE_RE: typing.Final = re.compile(r"[ \t\n\r]*")
+
+
+def _whitespace(doc: str, pos: int) -> int:
+    return typing.cast(re.Match[str], _WHITESPACE_RE.match(doc, pos)).end()
+
+
+def _expect(doc: str, pos: int, chars: str) -> str:
+    if pos >= len(doc) or doc[pos] not in chars:
+        raise json.JSONDecodeError(f"Expecting one of '{chars}'", doc, pos)
+    return doc[pos]
+
+
+def _project(value: typing.Any, projection: typing.Optional[Projection]) -> typing.Any:
+    if projection is None:
+        return value
+    if isinstance(value, dict):
+        return {key: _project(value[key], sub) for key, sub in projection.items() if key in value}
+    if isinstance(value, list):
+        return [_project(x, projection) for x in value]
+    return value
+
+
+def _object(doc: str, pos: int, projection: Projection) -> tuple[dict[str, typing.Any], int]:
+    ret: dict[str, typing.Any] = {}
+    pos = _whitespace(doc, pos + 1)
+    if _expect(doc, pos, '"}') == "}":
+        return ret, pos + 1
+    while True:
+        _expect(doc, pos, '"')
+        key, pos = json.decoder.scanstring(doc, pos + 1)  # type: ignore  # not in typeshed
+        pos = _whitespace(doc, pos)
+        _expect(doc, pos, ":")
+        pos = _whitespace(doc, pos + 1)
+        if key in projection:
+            ret[key], pos = _value(doc, pos, projection[key])
+        else:
+            pos = _DECODER.raw_decode(doc, pos)[1]
+        pos = _whitespace(doc, pos)
+        if _expect(doc, pos, ",}") == "}":
+            return ret, pos + 1
+        pos = _whitespace(doc, pos + 1)
+
+
+def _array(doc: str, pos: int, projection: Projection) -> tuple[list[typing.Any], int]:
+    ret: list[typing.Any] = []
+    pos = _whitespace(doc, pos + 1)
+    if doc.startswith("]", pos):
+        return ret, pos + 1
+    while True:
+        #
+        # Elements are decoded one at a time and projected,
+        # only a single element is fully decoded at any time.
+        #
+        value, pos = _DECODER.raw_decode(doc, pos)
+        ret.append(_project(value, projection))
+        pos = _whitespace(doc, pos)
+        if _expect(doc, pos, ",]") == "]":
+            return ret, pos + 1
+        pos = _whitespace(doc, pos + 1)
+
+
+def _value(doc: str, pos: int, projection: typing.Optional[Projection]) -> tuple[typing.Any, int]:
+    if projection is not None:
+        if doc.startswith("{", pos):
+            return _object(doc, pos, projection)
+        if doc.startswith("[", pos):
+            return _array(doc, pos, projection)
+    return _DECODER.raw_decode(doc, pos)
+
+
+def loads(data: bytes, projection: Projection) -> typing.Any:
+    doc = data.decode("utf-8")
+    value, pos = _value(doc, _whitespace(doc, 0), projection)
+    if _whitespace(doc, pos) != len(doc):
+        raise json.JSONDecodeError("Extra data", doc, pos)
+    return value
+
+
+__all__ = [
+    "Projection",
+    "loads",
+]
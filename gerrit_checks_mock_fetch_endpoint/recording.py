@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+import gzip
+import json
+import logging
+import queue
+import re
+import threading
+import typing
+import urllib.parse
+
+from .metrics import METRICS
+
+SCRUB_RE: typing.Final = re.compile(r"authorization|cookie|token|secret|password|key", re.IGNORECASE)
+SCRUBBED: typing.Final = "***"
+
+_logger = logging.getLogger("gerrit_checks_mock_fetch_endpoint.recording")
+
+
+class Record(typing.NamedTuple):
+    url: str
+    status: int
+    headers: dict[str, str]
+    body: bytes
+    latency: float
+
+
+def scrub_url(url: str) -> str:
+    parsed = urllib.parse.urlsplit(url)
+    query = [
+        (key, SCRUBBED if SCRUB_RE.search(key) else value)
+        for key, value in urllib.parse.parse_qsl(parsed.query, keep_blank_values=True)
+    ]
+    return urllib.parse.urlunsplit(
+        parsed._replace(netloc=parsed.netloc.rpartition("@")[2], query=urllib.parse.urlencode(query))
+    )
+
+
+def scrub_headers(headers: dict[str, str]) -> dict[str, str]:
+    return {key: SCRUBBED if SCRUB_RE.search(key) else value for key, value in headers.items()}
+
+
+def _encode(record: Record) -> str:
+    return json.dumps(
+        {
+            "url": scrub_url(record.url),
+            "status": record.status,
+            "headers": scrub_headers(record.headers),
+            #
+            # surrogateescape keeps non UTF-8 content lossless
+            #
+            "body": record.body.decode("utf-8", "surrogateescape"),
+            "latency": round(record.latency, 6),
+        },
+        separators=(",", ":"),
+    )
+
+
+class Recorder:
+    def __init__(self, path: str, max_pending: int = 1000):
+        self._path = path
+        self._queue: queue.Queue[typing.Optional[Record]] = queue.Queue(max_pending)
+        self._closed = False
+        #
+        # Opened here so that a bad path fails the driver creation
+        #
+        self._output = gzip.open(path, "at", encoding="utf-8")
+        self._thread = threading.Thread(target=self._write, name="recorder", daemon=True)
+        self._thread.start()
+
+    def record(self, record: Record) -> None:
+        #
+        # Encoding and writing are left to the writer thread
+        #
+        if self._closed:
+            return
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            METRICS.increment("recording.dropped")
+
+    def _write(self) -> None:
+        #
+        # A single gzip stream, flushed whenever the queue
+        # is empty so that the file is readable if the
+        # process is killed
+        #
+        with self._output as output:
+            while (record := self._queue.get()) is not None:
+                try:
+                    output.write(_encode(record) + "\n")
+                    if self._queue.empty():
+                        output.flush()
+                except OSError:
+                    METRICS.increment("recording.errors")
+                    _logger.error("Cannot record to '%s'", self._path, exc_info=True)
+
+    def close(self) -> None:
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+
+
+_recorders: dict[str, Recorder] = {}
+_recorders_lock = threading.Lock()
+
+
+def recorder(path: str) -> Recorder:
+    #
+    # Drivers recreated by a reload share the open stream
+    #
+    with _recorders_lock:
+        if path not in _recorders:
+            _recorders[path] = Recorder(path)
+        return _recorders[path]
+
+
+def close() -> None:
+    with _recorders_lock:
+        for _recorder in _recorders.values():
+            _recorder.close()
+        _recorders.clear()
+
+
+def _lines(recording: typing.TextIO) -> typing.Iterator[str]:
+    #
+    # A recording of a killed process ends without
+    # the gzip trailer, keep whatever was flushed
+    #
+    try:
+        for line in recording:
+            if line.endswith("\n"):
+                yield line
+    except EOFError:
+        pass
+
+
+def load(path: str) -> list[Record]:
+    records: list[Record] = []
+    with gzip.open(path, "rt", encoding="utf-8") as recording:
+        for line in _lines(recording):
+            record = json.loads(line)
+            records.append(
+                Record(
+                    url=record["url"],
+                    status=record["status"],
+                    headers=record["headers"],
+                    body=record["body"].encode("utf-8", "surrogateescape"),
+                    latency=record["latency"],
+                ),
+            )
+    return records
+
+
+__all__ = [
+    "Record",
+    "Recorder",
+    "close",
+    "load",
+    "recorder",
+    "scrub_headers",
+    "scrub_url",
+]
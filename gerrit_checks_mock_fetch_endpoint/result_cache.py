@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+import collections
+import json
+import sys
+import threading
+import time
+import typing
+
+from . import checks
+from .metrics import METRICS
+
+#
+# driver name, driver generation, project, change, revision
+#
+Key = tuple[str, int, str, int, int]
+
+RESPONSE_PREFIX: typing.Final = b'{"responseCode":"' + checks.ResponseCode.OK.value.encode("utf8") + b'","runs":['
+RESPONSE_SUFFIX: typing.Final = b"]}"
+
+
+class Entry(typing.NamedTuple):
+    fragments: tuple[bytes, ...]
+    completed: bool
+    expires: float
+    size: int
+    #
+    # Set on prewarmed entries, the ttl applied
+    # from their first hit
+    #
+    ttl_after_hit: typing.Optional[float] = None
+
+
+ENTRY_OVERHEAD: typing.Final = sys.getsizeof(Entry((), False, 0.0, 0))
+
+
+def encode_run(run: checks.CheckRun) -> bytes:
+    return json.dumps(run, separators=(",", ":")).encode("utf8")
+
+
+def encode(runs: list[checks.CheckRun]) -> tuple[bytes, ...]:
+    return tuple(encode_run(run) for run in runs)
+
+
+def assemble(entries: typing.Iterable[Entry]) -> bytes:
+    return RESPONSE_PREFIX + b",".join(fragment for entry in entries for fragment in entry.fragments) + RESPONSE_SUFFIX
+
+
+class ResultCache:
+    def __init__(self, max_bytes: int, ttl: float, ttl_completed: float):
+        self._max_bytes = max_bytes
+        self._ttl = ttl
+        self._ttl_completed = ttl_completed
+        self._lock = threading.Lock()
+        self._entries: collections.OrderedDict[Key, Entry] = collections.OrderedDict()
+        self._bytes = 0
+
+    def _account(self) -> None:
+        METRICS.set("result_cache.bytes", self._bytes)
+        METRICS.set("result_cache.entries", len(self._entries))
+
+    def get(self, key: Key, stale: bool = False) -> typing.Optional[Entry]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                if entry.ttl_after_hit is not None and not stale and entry.expires >= now:
+                    entry = self._entries[key] = entry._replace(
+                        expires=min(entry.expires, now + entry.ttl_after_hit),
+                        ttl_after_hit=None,
+                    )
+        if entry is None or (not stale and entry.expires < now):
+            METRICS.increment("result_cache.misses")
+            return None
+        METRICS.increment("result_cache.hits")
+        return entry
+
+    def discard(self, name: str, generation: int) -> None:
+        with self._lock:
+            for key in [x for x in self._entries if x[:2] == (name, generation)]:
+                self._bytes -= self._entries.pop(key).size
+            self._account()
+
+    def put(
+        self,
+        key: Key,
+        runs: list[checks.CheckRun],
+        store: bool = True,
+        ttl: typing.Optional[float] = None,
+        fragments: typing.Optional[tuple[bytes, ...]] = None,
+    ) -> Entry:
+        #
+        # An entry put with a ttl is kept at least that long
+        # or until its first hit. The runs are encoded here
+        # unless their fragments are given.
+        #
+        if fragments is None:
+            fragments = encode(runs)
+        completed = all(run["status"] == checks.RunStatus.COMPLETED for run in runs)
+        default_ttl = self._ttl_completed if fragments and completed else self._ttl
+        entry = Entry(
+            fragments=fragments,
+            completed=completed,
+            expires=time.monotonic() + (default_ttl if ttl is None else max(default_ttl, ttl)),
+            #
+            # Account the actual object sizes, the fragments
+            # are the bulk of an entry.
+            #
+            size=(
+                sys.getsizeof(key)
+                + sys.getsizeof(fragments)
+                + sum(sys.getsizeof(fragment) for fragment in fragments)
+                + ENTRY_OVERHEAD
+            ),
+            ttl_after_hit=None if ttl is None else default_ttl,
+        )
+        if not store or entry.size > self._max_bytes:
+            return entry
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.size
+            self._entries[key] = entry
+            self._bytes += entry.size
+            while self._bytes > self._max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+                METRICS.increment("result_cache.evictions")
+            self._account()
+        return entry
+
+
+__all__ = [
+    "Entry",
+    "Key",
+    "ResultCache",
+    "assemble",
+    "encode",
+    "encode_run",
+]
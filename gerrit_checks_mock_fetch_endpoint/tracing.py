@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+import contextlib
+import contextvars
+import cProfile
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+import typing
+import uuid
+
+from .metrics import METRICS
+
+REQUEST_ID_RE: typing.Final = re.compile(r"^[\w.-]{1,64}$")
+
+
+class Span(typing.NamedTuple):
+    name: str
+    tags: dict[str, typing.Any]
+    start: float
+    duration: float
+
+
+class Trace:
+    def __init__(self, request_id: str):
+        self.request_id = request_id
+        self.tags: dict[str, typing.Any] = {}
+        self.spans: list[Span] = []
+        self.started = time.monotonic()
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def record(self) -> dict[str, typing.Any]:
+        return {
+            "id": self.request_id,
+            **self.tags,
+            "duration": round(self.elapsed(), 6),
+            "spans": [
+                {
+                    "name": span.name,
+                    **span.tags,
+                    "start": round(span.start, 6),
+                    "duration": round(span.duration, 6),
+                }
+                for span in self.spans
+            ],
+        }
+
+
+_current: contextvars.ContextVar[typing.Optional[Trace]] = contextvars.ContextVar("trace", default=None)
+
+#
+# Only one profiler may be active at a time
+#
+_profile_lock = threading.Lock()
+
+_logger = logging.getLogger("gerrit_checks_mock_fetch_endpoint.tracing")
+
+_NO_SPAN: typing.Final = contextlib.nullcontext()
+
+
+@contextlib.contextmanager
+def _span(current: Trace, name: str, tags: dict[str, typing.Any]) -> typing.Iterator[None]:
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        current.spans.append(Span(name, tags, started - current.started, time.monotonic() - started))
+
+
+def span(name: str, **tags: typing.Any) -> typing.ContextManager[None]:
+    #
+    # Untraced requests share a no-op context
+    #
+    current = _current.get()
+    if current is None:
+        return _NO_SPAN
+    return _span(current, name, tags)
+
+
+def tag(**tags: typing.Any) -> None:
+    current = _current.get()
+    if current is not None:
+        current.tags.update(tags)
+
+
+@contextlib.contextmanager
+def _profile(request_id: str, profile_dir: str) -> typing.Iterator[None]:
+    if not _profile_lock.acquire(blocking=False):
+        yield
+        return
+
+    try:
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            path = os.path.join(profile_dir, f"fetch-{request_id}.prof")
+            #
+            # The response is already sent, never fail the request
+            #
+            try:
+                profile.dump_stats(path)
+                _logger.info("Profile of request %s written to '%s'", request_id, path)
+            except OSError:
+                METRICS.increment("fetch.profile_errors")
+                _logger.error("Cannot write profile of request %s to '%s'", request_id, path, exc_info=True)
+    finally:
+        _profile_lock.release()
+
+
+@contextlib.contextmanager
+def trace(
+    request_id: typing.Optional[str],
+    slow_threshold: float,
+    profile_rate: float,
+    profile_dir: str,
+) -> typing.Iterator[None]:
+    profiled = profile_rate > 0 and random.random() < profile_rate  # nosec
+    if slow_threshold <= 0 and not profiled:
+        yield
+        return
+
+    #
+    # The request id names the profile file, accept only safe ids
+    #
+    if request_id is None or not REQUEST_ID_RE.match(request_id):
+        request_id = uuid.uuid4().hex[:16]
+    current = Trace(request_id)
+    token = _current.set(current)
+    try:
+        with _profile(current.request_id, profile_dir) if profiled else contextlib.nullcontext():
+            yield
+    finally:
+        _current.reset(token)
+        if 0 < slow_threshold <= current.elapsed():
+            METRICS.increment("fetch.slow")
+            _logger.warning("Slow request %s", json.dumps(current.record(), separators=(",", ":")))
+
+
+__all__ = [
+    "Span",
+    "Trace",
+    "span",
+    "tag",
+    "trace",
+]
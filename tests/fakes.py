@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+import argparse
+import configparser
+import contextlib
+import functools
+import http.client
+import http.server
+import json
+import threading
+import typing
+
+from gerrit_checks_mock_fetch_endpoint import (
+    admission,
+    checks,
+    driver,
+    fetch_endpoint,
+    lifecycle,
+    prewarm,
+    result_cache,
+)
+from gerrit_checks_mock_fetch_endpoint.__main__ import MyServer, Reloader, Runtime
+
+
+class FakeDriver(driver.DriverBase):  # pylint: disable=too-few-public-methods
+    def __init__(self, name: str = "fake") -> None:
+        config = configparser.ConfigParser()
+        config.read_dict({name: {}})
+        super().__init__(name=name, config=config[name])
+        self.calls = 0
+        self.error: typing.Optional[Exception] = None
+        self.runs: list[checks.CheckRun] = []
+        #
+        # When set, calls block until it is set
+        #
+        self.gate: typing.Optional[threading.Event] = None
+        self.entered = threading.Event()
+
+    def run(
+        self,
+        request: fetch_endpoint.FetchEndpoint,
+        deadline: driver.Deadline,
+    ) -> list[checks.CheckRun]:
+        self.calls += 1
+        self.entered.set()
+        if self.gate is not None:
+            self.gate.wait()
+        if self.error is not None:
+            raise self.error
+        return self.runs
+
+
+def runs(status: checks.RunStatus) -> list[checks.CheckRun]:
+    return [checks.CheckRun(checkName="check", status=status, results=[])]  # type: ignore  # until python-3.11
+
+
+def make_request(change: int) -> fetch_endpoint.FetchEndpoint:
+    return typing.cast(
+        fetch_endpoint.FetchEndpoint,
+        {"project": "project", "changeId": change, "revision": 1},
+    )
+
+
+def workflow_run(number: int, updated_at: str = "2022-01-01T00:00:00Z") -> dict[str, typing.Any]:
+    return {
+        "id": number,
+        "name": f"wf{number}",
+        "status": "completed",
+        "conclusion": "success",
+        "run_attempt": 1,
+        "path": ".github/workflows/x.yml",
+        "html_url": f"https://example.com/{number}",
+        "updated_at": updated_at,
+    }
+
+
+class Server(typing.NamedTuple):
+    port: int
+    results: result_cache.ResultCache
+    admission: admission.Admission
+    lifecycle: lifecycle.Lifecycle
+
+
+@contextlib.contextmanager
+def serve(
+    drivers: list[driver.DriverBase],
+    main: typing.Optional[dict[str, str]] = None,
+    prewarmer: typing.Optional[prewarm.Prewarmer] = None,
+) -> typing.Iterator[Server]:
+    config = configparser.ConfigParser()
+    config.read_dict({"main": main or {}})
+    results = result_cache.ResultCache(max_bytes=1 << 20, ttl=5, ttl_completed=60)
+    server = Server(
+        port=0,
+        results=results,
+        admission=admission.Admission(
+            max_in_flight=config["main"].getint("max_in_flight", 16),
+            max_queue_wait=config["main"].getfloat("max_queue_wait", 0.5),
+        ),
+        lifecycle=lifecycle.Lifecycle(),
+    )
+    httpd = http.server.ThreadingHTTPServer(
+        ("127.0.0.1", 0),
+        functools.partial(
+            MyServer,
+            reloader=Reloader(args=argparse.Namespace(), results=results, runtime=Runtime(config, drivers)),
+            results=results,
+            admission_control=server.admission,
+            lifecycle_control=server.lifecycle,
+            prewarmer=prewarmer,
+        ),
+    )
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server._replace(port=httpd.server_address[1])
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+def post(port: int, path: str, body: typing.Any) -> tuple[int, dict[str, str], bytes]:
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    try:
+        connection.request(
+            "POST",
+            path,
+            body=body if isinstance(body, bytes) else json.dumps(body).encode("utf8"),
+            headers={"Accept": "application/json", "Content-Type": "application/json"},
+        )
+        response = connection.getresponse()
+        return response.status, {k.lower(): v for k, v in response.getheaders()}, response.read()
+    finally:
+        connection.close()
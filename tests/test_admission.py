@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+import typing
+
+import pytest
+
+from gerrit_checks_mock_fetch_endpoint import admission, checks, driver, result_cache
+from gerrit_checks_mock_fetch_endpoint.__main__ import _answer
+from gerrit_checks_mock_fetch_endpoint.metrics import METRICS
+
+from .fakes import FakeDriver, make_request, post, runs, serve
+
+
+def _count(name: str) -> int:
+    return METRICS.snapshot().get(name, 0)
+
+
+def test_shed_after_max_queue_wait() -> None:
+    control = admission.Admission(max_in_flight=1, max_queue_wait=0.1)
+    shed = _count("admission.shed")
+    with control.admit(5) as admitted:
+        assert admitted
+        started = time.monotonic()
+        with control.admit(5) as queued:
+            assert not queued
+        assert 0.1 <= time.monotonic() - started < 1
+    assert _count("admission.shed") == shed + 1
+
+    #
+    # The request deadline bounds the wait too
+    #
+    with control.admit(5):
+        started = time.monotonic()
+        with control.admit(0) as queued:
+            assert not queued
+        assert time.monotonic() - started < 0.1
+
+    with control.admit(5) as admitted:
+        assert admitted
+
+
+@pytest.fixture(name="busy")
+def _busy() -> typing.Iterator[admission.Admission]:
+    #
+    # An admission control whose only slot is taken
+    #
+    control = admission.Admission(max_in_flight=1, max_queue_wait=0.1)
+    with control.admit(5):
+        yield control
+
+
+def test_fresh_not_queued(monkeypatch: pytest.MonkeyPatch) -> None:
+    results = result_cache.ResultCache(max_bytes=1 << 20, ttl=5, ttl_completed=60)
+    fake = FakeDriver()
+    fake.runs = runs(checks.RunStatus.RUNNING)
+    idle = admission.Admission(max_in_flight=1, max_queue_wait=0.1)
+    warm = _answer([fake], results, idle, make_request(1), driver.Deadline(5))
+
+    #
+    # Fresh results are answered even without a free slot
+    #
+    control = admission.Admission(max_in_flight=1, max_queue_wait=60)
+    monkeypatch.setattr(control, "admit", None)
+    assert _answer([fake], results, control, make_request(1), driver.Deadline(5)) == warm
+    assert fake.calls == 1
+
+
+def test_shed_from_stale(monkeypatch: pytest.MonkeyPatch, busy: admission.Admission) -> None:
+    now = [1000.0]
+    monkeypatch.setattr("time.monotonic", lambda: now[0])
+    results = result_cache.ResultCache(max_bytes=1 << 20, ttl=5, ttl_completed=60)
+    fake = FakeDriver()
+    fake.runs = runs(checks.RunStatus.RUNNING)
+    idle = admission.Admission(max_in_flight=1, max_queue_wait=0.1)
+    warm = _answer([fake], results, idle, make_request(1), driver.Deadline(5))
+    assert warm is not None
+    now[0] += 10
+
+    #
+    # Expired results are served when shed,
+    # a zero deadline avoids the wait of the frozen clock
+    #
+    shed = _count("admission.shed_from_cache")
+    assert _answer([fake], results, busy, make_request(1), driver.Deadline(0)) == (warm[0], False)
+    assert _count("admission.shed_from_cache") == shed + 1
+
+    assert _answer([fake], results, busy, make_request(2), driver.Deadline(0)) is None
+    assert fake.calls == 1
+
+
+def test_overloaded() -> None:
+    fake = FakeDriver()
+    fake.runs = runs(checks.RunStatus.RUNNING)
+    fake.gate = threading.Event()
+    with serve([fake], {"max_in_flight": "1", "max_queue_wait": "0.1", "retry_after": "7"}) as server:
+        #
+        # Take the only slot with a request blocked upstream
+        #
+        blocked = threading.Thread(target=post, args=(server.port, "/fetch", make_request(1)))
+        blocked.start()
+        try:
+            assert fake.entered.wait(5)
+            status, headers, _ = post(server.port, "/fetch", make_request(2))
+            assert status == 503
+            assert headers["retry-after"] == "7"
+        finally:
+            fake.gate.set()
+            blocked.join()
+
+        #
+        # Fresh results are answered without a slot
+        #
+        with server.admission.admit(5):
+            status, _, body = post(server.port, "/fetch", make_request(1))
+        assert status == 200
+        assert b'"checkName":"check"' in body
+        assert fake.calls == 1
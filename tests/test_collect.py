@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+import typing
+
+import pytest
+
+from gerrit_checks_mock_fetch_endpoint import (
+    checks,
+    driver,
+    fetch_endpoint,
+    result_cache,
+)
+from gerrit_checks_mock_fetch_endpoint.__main__ import _collect, _final
+
+from .fakes import FakeDriver, make_request, runs as _runs
+
+REQUEST: typing.Final = make_request(1)
+
+
+@pytest.mark.parametrize(
+    "error",
+    [
+        driver.UpstreamError("Service Unavailable"),
+        TimeoutError("Request deadline exceeded"),
+        KeyError("workflow_runs"),
+    ],
+)
+def test_failure_not_cached(error: Exception) -> None:
+    fake = FakeDriver()
+    results = result_cache.ResultCache(max_bytes=1 << 20, ttl=5, ttl_completed=60)
+
+    fake.error = error
+    assert _collect([fake], results, REQUEST, driver.Deadline(5)) == ([], False)
+
+    fake.error = None
+    fake.runs = _runs(checks.RunStatus.RUNNING)
+    entries, fresh = _collect([fake], results, REQUEST, driver.Deadline(5))
+    assert fake.calls == 2
+    assert fresh
+    assert entries and entries[0].fragments
+
+
+def test_failure_uses_stale(monkeypatch: pytest.MonkeyPatch) -> None:
+    now = [1000.0]
+    monkeypatch.setattr("time.monotonic", lambda: now[0])
+    fake = FakeDriver()
+    results = result_cache.ResultCache(max_bytes=1 << 20, ttl=5, ttl_completed=60)
+
+    fake.runs = _runs(checks.RunStatus.RUNNING)
+    warm, _ = _collect([fake], results, REQUEST, driver.Deadline(5))
+
+    now[0] += 10
+    fake.error = driver.UpstreamError("Service Unavailable")
+    assert _collect([fake], results, REQUEST, driver.Deadline(5)) == (warm, False)
+    assert fake.calls == 2
+
+
+def test_deadline_uses_stale(monkeypatch: pytest.MonkeyPatch) -> None:
+    now = [1000.0]
+    monkeypatch.setattr("time.monotonic", lambda: now[0])
+    fake = FakeDriver()
+    results = result_cache.ResultCache(max_bytes=1 << 20, ttl=5, ttl_completed=60)
+
+    fake.runs = _runs(checks.RunStatus.RUNNING)
+    warm, _ = _collect([fake], results, REQUEST, driver.Deadline(5))
+    now[0] += 10
+
+    #
+    # Out of time before the driver is called
+    #
+    assert _collect([fake], results, REQUEST, driver.Deadline(0)) == (warm, False)
+    assert fake.calls == 1
+
+    #
+    # Out of time while the driver runs
+    #
+    def slow_run(  # pylint: disable=unused-argument
+        request: fetch_endpoint.FetchEndpoint,
+        deadline: driver.Deadline,
+    ) -> list[checks.CheckRun]:
+        now[0] += 10
+        return []
+
+    monkeypatch.setattr(fake, "run", slow_run)
+    assert _collect([fake], results, REQUEST, driver.Deadline(5)) == (warm, False)
+
+
+def test_replaced_driver_results_not_served() -> None:
+    results = result_cache.ResultCache(max_bytes=1 << 20, ttl=5, ttl_completed=60)
+    previous = FakeDriver()
+    previous.runs = _runs(checks.RunStatus.COMPLETED)
+    current = FakeDriver()
+
+    #
+    # A request still in progress on the previous driver
+    # completes after the reload
+    #
+    _collect([previous], results, REQUEST, driver.Deadline(5))
+    entries, _ = _collect([current], results, REQUEST, driver.Deadline(5))
+    assert current.calls == 1
+    assert entries and not entries[0].fragments
+
+
+@pytest.mark.parametrize(
+    "statuses, final",
+    [
+        ([checks.RunStatus.COMPLETED, checks.RunStatus.COMPLETED], True),
+        ([checks.RunStatus.COMPLETED, None], False),
+        ([None, checks.RunStatus.COMPLETED], False),
+        ([checks.RunStatus.COMPLETED, checks.RunStatus.RUNNING], False),
+        ([None, None], False),
+    ],
+)
+def test_final(statuses: list[typing.Optional[checks.RunStatus]], final: bool) -> None:
+    results = result_cache.ResultCache(max_bytes=1 << 20, ttl=5, ttl_completed=60)
+    fakes = [FakeDriver("github"), FakeDriver("bitbucket")]
+    for fake, status in zip(fakes, statuses):
+        #
+        # None is a pipeline which is not started yet
+        #
+        fake.runs = [] if status is None else _runs(status)
+
+    entries, fresh = _collect(list(fakes), results, REQUEST, driver.Deadline(5))
+    assert len(entries) == 2
+    assert _final(entries, fresh) is final
+    assert not _final(entries, False)
+
+
+def test_final_without_drivers() -> None:
+    assert not _final([], True)
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+import typing
+
+import pytest
+
+from gerrit_checks_mock_fetch_endpoint.__main__ import _accepts_gzip, _etag_match
+
+ETAG: typing.Final = 'W/"0123abcd"'
+
+
+@pytest.mark.parametrize(
+    "if_none_match, expected",
+    [
+        (None, False),
+        ("", False),
+        ("*", True),
+        (" * ", True),
+        ('W/"0123abcd"', True),
+        ('"0123abcd"', True),
+        ('"other", W/"0123abcd"', True),
+        ('"other" ,"0123abcd" ', True),
+        ('"other"', False),
+        ('W/"0123abcde"', False),
+        ("0123abcd", False),
+    ],
+)
+def test_etag_match(if_none_match: typing.Optional[str], expected: bool) -> None:
+    assert _etag_match(if_none_match, ETAG) is expected
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, expected",
+    [
+        (None, False),
+        ("", False),
+        ("gzip", True),
+        ("GZIP", True),
+        ("deflate, gzip", True),
+        ("deflate , gzip;q=0.5", True),
+        ("gzip;q=1.0, br", True),
+        ("gzip;q=0", False),
+        ("gzip; q=0.000", False),
+        ("gzip;q=invalid", False),
+        ("deflate, br", False),
+        ("x-gzip", False),
+        ("*", False),
+    ],
+)
+def test_accepts_gzip(accept_encoding: typing.Optional[str], expected: bool) -> None:
+    assert _accepts_gzip(accept_encoding) is expected
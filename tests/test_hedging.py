@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+import configparser
+import threading
+import time
+
+from gerrit_checks_mock_fetch_endpoint import hedging
+
+
+def _hedging(**options: str) -> hedging.Hedging:
+    config = configparser.ConfigParser()
+    config.read_dict({"fake": {"hedge_min_samples": "1", "hedge_min_delay": "0.01", **options}})
+    ret = hedging.Hedging("fake", config["fake"])
+    ret.observe(0.01, None)
+    return ret
+
+
+def test_inline_without_tokens() -> None:
+    hedge = _hedging(hedge_burst="0", hedge_ratio="0")
+    threads: list[threading.Thread] = []
+
+    def attempt(cancelled: threading.Event) -> int:  # pylint: disable=unused-argument
+        threads.append(threading.current_thread())
+        return 1
+
+    assert hedge.call(attempt, 1) == 1
+    assert threads == [threading.current_thread()]
+
+
+def test_inline_when_rate_limited() -> None:
+    hedge = _hedging(hedge_rate_limit_reserve="100")
+    hedge.observe(0.01, "50")
+    threads: list[threading.Thread] = []
+
+    def attempt(cancelled: threading.Event) -> int:  # pylint: disable=unused-argument
+        threads.append(threading.current_thread())
+        return 1
+
+    assert hedge.call(attempt, 1) == 1
+    assert threads == [threading.current_thread()]
+
+
+def test_hedge_wins() -> None:
+    hedge = _hedging()
+    calls: list[int] = []
+    lock = threading.Lock()
+
+    def attempt(cancelled: threading.Event) -> int:
+        with lock:
+            calls.append(len(calls))
+            index = calls[-1]
+        if index == 0:
+            cancelled.wait(1)
+            raise RuntimeError("Fetch cancelled")
+        return index
+
+    started = time.monotonic()
+    assert hedge.call(attempt, 2) == 1
+    assert time.monotonic() - started < 0.5
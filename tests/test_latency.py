@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+import random
+
+import pytest
+
+from gerrit_checks_mock_fetch_endpoint import latency
+
+
+@pytest.mark.parametrize(
+    "spec",
+    ["fixed:0", "fixed:0.5", "uniform:0.1,0.2", "uniform:0,0", "exponential:0.5", "lognormal:-3,0.5"],
+)
+def test_valid(spec: str) -> None:
+    assert latency.sampler(spec)(random.Random(0)) >= 0
+
+
+@pytest.mark.parametrize(
+    "spec",
+    [
+        "fixed",
+        "fixed:",
+        "fixed:-1",
+        "fixed:1,2",
+        "uniform:1",
+        "uniform:2,1",
+        "uniform:-1,1",
+        "exponential",
+        "exponential:0",
+        "exponential:-1",
+        "lognormal:1",
+        "lognormal:1,-1",
+        "lognormal:x,1",
+        "normal:1,1",
+    ],
+)
+def test_invalid(spec: str) -> None:
+    with pytest.raises(ValueError):
+        latency.sampler(spec)
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+import typing
+
+from gerrit_checks_mock_fetch_endpoint import lifecycle, prewarm
+
+from .fakes import FakeDriver, post, serve
+
+
+class Drain(threading.Thread):
+    def __init__(self, control: lifecycle.Lifecycle, delay: float, timeout: float):
+        super().__init__()
+        self._control = control
+        self._delay = delay
+        self._timeout = timeout
+        self.drained: typing.Optional[bool] = None
+
+    def run(self) -> None:
+        self.drained = self._control.drain(self._delay, self._timeout)
+
+
+def test_drain_waits() -> None:
+    control = lifecycle.Lifecycle()
+    entered = threading.Event()
+    done = threading.Event()
+
+    def request() -> None:
+        with control.request() as accepted:
+            assert accepted
+            entered.set()
+            done.wait()
+
+    in_flight = threading.Thread(target=request)
+    in_flight.start()
+    assert entered.wait(5)
+
+    drain = Drain(control, delay=0, timeout=10)
+    drain.start()
+    drain.join(0.2)
+    assert drain.is_alive()
+    assert control.draining
+
+    done.set()
+    in_flight.join()
+    drain.join(5)
+    assert drain.drained is True
+
+
+def test_refused_after_delay() -> None:
+    control = lifecycle.Lifecycle()
+    drain = Drain(control, delay=0.3, timeout=10)
+    drain.start()
+    while not control.draining:
+        time.sleep(0.01)
+
+    #
+    # Accepted until the load balancer had time to notice
+    #
+    with control.request() as accepted:
+        assert accepted
+    drain.join(5)
+    assert drain.drained is True
+
+    with control.request() as accepted:
+        assert not accepted
+
+
+def test_drain_timeout() -> None:
+    control = lifecycle.Lifecycle()
+    with control.request() as accepted:
+        assert accepted
+        started = time.monotonic()
+        assert not control.drain(delay=0, timeout=0.1)
+        assert 0.1 <= time.monotonic() - started < 1
+
+
+def test_events_refused() -> None:
+    prewarmer = prewarm.Prewarmer(delay=3600, workers=1, max_pending=10, warm=lambda request: None)
+    scheduled: list[typing.Any] = []
+    prewarmer.schedule = scheduled.append  # type: ignore
+    event = b'{"type": "patchset-created", "change": {"project": "project", "number": 1}, "patchSet": {"number": 1}}'
+    try:
+        with serve([FakeDriver()], {"drain_delay": "0"}, prewarmer=prewarmer) as server:
+            status, _, _ = post(server.port, "/events", event)
+            assert status == 204
+            assert len(scheduled) == 1
+
+            assert server.lifecycle.drain(delay=0, timeout=1)
+            status, headers, _ = post(server.port, "/events", event)
+            assert status == 503
+            assert "retry-after" in headers
+            assert len(scheduled) == 1
+    finally:
+        prewarmer.stop()
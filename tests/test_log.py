@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+import logging
+
+import pytest
+
+from gerrit_checks_mock_fetch_endpoint import log
+
+
+def _emit(limit: int, *args: object) -> str:
+    record = logging.LogRecord("test", logging.INFO, __file__, 1, "%s", args, None)
+    log.PayloadFilter(limit).filter(record)
+    return record.getMessage()
+
+
+def test_str() -> None:
+    assert _emit(4, log.Payload("abcdefgh")) == "abcd... (4 more)"
+    assert _emit(8, log.Payload("abcdefgh")) == "abcdefgh"
+
+
+@pytest.mark.parametrize("kind", [bytes, bytearray])
+def test_bytes(kind: type) -> None:
+    message = _emit(4, log.Payload(kind(5_000_000)))
+    assert "b'\\x00\\x00\\x00\\x00'" in message
+    assert message.endswith("... (4999996 more)")
+    assert len(message) < 100
+
+
+def test_other() -> None:
+    assert _emit(64, log.Payload({"runs": list(range(100))})).endswith("... (69 more)")
+    assert _emit(0, log.Payload("abcdefgh")) == "abcdefgh"
+    assert _emit(4, "abcdefgh") == "abcdefgh"
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+import json
+import typing
+
+import pytest
+
+from gerrit_checks_mock_fetch_endpoint import fetch_endpoint, prewarm
+from gerrit_checks_mock_fetch_endpoint.metrics import METRICS
+
+
+def _event(change: typing.Any, patch_set: typing.Any = 3, kind: str = "patchset-created") -> str:
+    return json.dumps(
+        {"type": kind, "change": {"project": "project", "number": change}, "patchSet": {"number": patch_set}}
+    )
+
+
+@pytest.fixture(name="scheduled")
+def _scheduled() -> typing.Iterator[tuple[prewarm.Prewarmer, list[fetch_endpoint.FetchEndpoint]]]:
+    prewarmer = prewarm.Prewarmer(delay=3600, workers=1, max_pending=10, warm=lambda request: None)
+    requests: list[fetch_endpoint.FetchEndpoint] = []
+    prewarmer.schedule = requests.append  # type: ignore
+    yield prewarmer, requests
+    prewarmer.stop()
+
+
+@pytest.mark.parametrize(
+    "line",
+    [
+        "not json",
+        "[]",
+        '"patchset-created"',
+        '{"type": "patchset-created"}',
+        _event("x"),
+        _event(1, patch_set=None),
+        '{"type": "patchset-created", "change": "project~1", "patchSet": {"number": 1}}',
+    ],
+)
+def test_invalid(scheduled: tuple[prewarm.Prewarmer, list[fetch_endpoint.FetchEndpoint]], line: str) -> None:
+    prewarmer, requests = scheduled
+    invalid = METRICS.snapshot().get("prewarm.invalid_events", 0)
+    prewarmer.ingest(line)
+    assert not requests
+    assert METRICS.snapshot()["prewarm.invalid_events"] == invalid + 1
+
+
+def test_ingest(scheduled: tuple[prewarm.Prewarmer, list[fetch_endpoint.FetchEndpoint]]) -> None:
+    prewarmer, requests = scheduled
+    for line in [_event("12"), "", "  ", _event(13, kind="change-merged"), _event(14, patch_set="2")]:
+        prewarmer.ingest(line)
+    assert requests == [
+        {"project": "project", "changeId": 12, "revision": 3},
+        {"project": "project", "changeId": 14, "revision": 2},
+    ]
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+import json
+import typing
+
+import pytest
+
+from gerrit_checks_mock_fetch_endpoint import projection
+
+DOCUMENT: typing.Final = {
+    "total_count": 2,
+    "workflow_runs": [
+        {
+            "id": 1,
+            "name": 'build "quoted" \\ ש',
+            "status": None,
+            "head_commit": {"message": "a ] } , : [ {", "nested": [[1, 2], {"a": None}]},
+            "pull_requests": [],
+        },
+        {
+            "id": 2,
+            "name": "test",
+            "status": "completed",
+            "head_commit": None,
+            "pull_requests": [{"id": 3}],
+        },
+    ],
+}
+
+PROJECTION: typing.Final = {
+    "workflow_runs": {
+        "id": None,
+        "name": None,
+        "status": None,
+        "missing": None,
+    },
+}
+
+
+def _expected(value: typing.Any, proj: projection.Projection) -> typing.Any:
+    return projection._project(value, proj)  # pylint: disable=protected-access
+
+
+@pytest.mark.parametrize(
+    "dumps",
+    [
+        json.dumps,
+        lambda x: json.dumps(x, separators=(",", ":")),
+        lambda x: json.dumps(x, indent=4),
+        lambda x: " \n\t" + json.dumps(x, separators=(" ,\r\n ", " \t: ")) + "\n ",
+        lambda x: json.dumps(x, ensure_ascii=False),
+    ],
+)
+def test_whitespace(dumps: typing.Callable[[typing.Any], str]) -> None:
+    data = dumps(DOCUMENT).encode("utf-8")
+    assert projection.loads(data, PROJECTION) == {
+        "workflow_runs": [
+            {"id": 1, "name": 'build "quoted" \\ ש', "status": None},
+            {"id": 2, "name": "test", "status": "completed"},
+        ],
+    }
+
+
+@pytest.mark.parametrize(
+    "proj",
+    [
+        {},
+        {"total_count": None},
+        {"workflow_runs": None},
+        {"workflow_runs": {"head_commit": None}},
+        {"workflow_runs": {"head_commit": {"nested": None}}},
+        {"workflow_runs": {"head_commit": {"nested": {"a": None}}}},
+        {"workflow_runs": {"pull_requests": {"id": None}}},
+        {"total_count": {"x": None}},
+    ],
+)
+def test_matches_json_loads(proj: projection.Projection) -> None:
+    data = json.dumps(DOCUMENT).encode("utf-8")
+    assert projection.loads(data, proj) == _expected(json.loads(data), proj)
+
+
+@pytest.mark.parametrize(
+    "document",
+    [
+        None,
+        [],
+        [{"id": 1, "x": 2}, 3, None],
+        {"id": None},
+        "string",
+        1.5e10,
+    ],
+)
+def test_non_object_values(document: typing.Any) -> None:
+    data = json.dumps(document).encode("utf-8")
+    assert projection.loads(data, {"id": None}) == _expected(json.loads(data), {"id": None})
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        b"",
+        b"{",
+        b'{"id": 1',
+        b'{"id" 1}',
+        b'{"id": 1,}',
+        b'{"skip": [1, 2}',
+        b'{"workflow_runs": [1, 2}',
+        b'{"workflow_runs": [1 2]}',
+        b"{id: 1}",
+        b'{"id": 1} x',
+        b'{"id": 1}{}',
+    ],
+)
+def test_malformed(data: bytes) -> None:
+    with pytest.raises(json.JSONDecodeError):
+        json.loads(data)
+    with pytest.raises(json.JSONDecodeError):
+        projection.loads(data, {"id": None, "workflow_runs": {"id": None}})
+
+
+def test_invalid_utf8() -> None:
+    with pytest.raises(UnicodeDecodeError):
+        projection.loads(b'{"id": "\xff"}', {"id": None})
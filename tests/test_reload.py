@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+import argparse
+import configparser
+import pathlib
+import typing
+
+import pytest
+
+from gerrit_checks_mock_fetch_endpoint import (
+    checks,
+    driver,
+    driver_github,
+    driver_sandbox,
+    result_cache,
+)
+from gerrit_checks_mock_fetch_endpoint.__main__ import (
+    Reloader,
+    Runtime,
+    _create_drivers,
+)
+
+from .fakes import make_request, runs
+
+GITHUB: typing.Final = {"base_url": "https://example.com/repos/space", "token": "abc"}
+
+
+def _config(drivers: str, **sections: dict[str, str]) -> configparser.ConfigParser:
+    config = configparser.ConfigParser()
+    config.read_dict({"main": {"drivers": drivers}, **sections})
+    return config
+
+
+def _runtime(config: configparser.ConfigParser, previous: typing.Optional[Runtime] = None) -> Runtime:
+    return Runtime(config=config, drivers=_create_drivers(config, previous))
+
+
+def test_create() -> None:
+    current = _runtime(_config("github, sandbox", github=GITHUB, sandbox={}))
+    assert [type(x) for x in current.drivers] == [driver_github.Driver, driver_sandbox.Driver]
+    assert [x.name for x in current.drivers] == ["github", "sandbox"]
+    assert len({x.generation for x in current.drivers}) == 2
+
+
+def test_unchanged_kept() -> None:
+    previous = _runtime(_config("github, sandbox", github=GITHUB, sandbox={"runs": "2"}))
+    current = _runtime(_config("github,sandbox", github=dict(GITHUB), sandbox={"runs": "2"}), previous)
+    assert all(x is y for x, y in zip(current.drivers, previous.drivers))
+
+
+def test_changed_recreated() -> None:
+    previous = _runtime(_config("github, sandbox", github=GITHUB, sandbox={"runs": "2"}))
+    current = _runtime(_config("github, sandbox", github=GITHUB, sandbox={"runs": "3"}), previous)
+    assert current.drivers[0] is previous.drivers[0]
+    assert current.drivers[1] is not previous.drivers[1]
+    assert current.drivers[1].generation != previous.drivers[1].generation
+
+
+def test_added_and_removed() -> None:
+    previous = _runtime(_config("github", github=GITHUB))
+    added = _runtime(_config("sandbox, github", github=GITHUB, sandbox={}), previous)
+    assert added.drivers[1] is previous.drivers[0]
+    assert isinstance(added.drivers[0], driver_sandbox.Driver)
+
+    removed = _runtime(_config("sandbox", github=GITHUB, sandbox={}), added)
+    assert removed.drivers == [added.drivers[0]]
+
+    #
+    # A driver removed then added again is a new driver
+    #
+    again = _runtime(_config("sandbox, github", github=GITHUB, sandbox={}), removed)
+    assert again.drivers[0] is added.drivers[0]
+    assert again.drivers[1] is not previous.drivers[0]
+
+
+@pytest.mark.parametrize(
+    "config",
+    [
+        _config("", github=GITHUB),
+        _config("unknown"),
+        _config("github", github={"token": "abc"}),
+        _config("sandbox", sandbox={"latency": "exponential:0"}),
+    ],
+)
+def test_invalid(config: configparser.ConfigParser) -> None:
+    previous = _runtime(_config("github", github=GITHUB))
+    with pytest.raises((RuntimeError, KeyError, ValueError)):
+        _create_drivers(config, previous)
+
+
+def _write(path: pathlib.Path, config: configparser.ConfigParser) -> None:
+    with path.open("w", encoding="utf-8") as output:
+        config.write(output)
+
+
+def test_reload(tmp_path: pathlib.Path) -> None:
+    path = tmp_path / "config.ini"
+    config = _config("github, sandbox", github=GITHUB, sandbox={"runs": "2"})
+    results = result_cache.ResultCache(max_bytes=1 << 20, ttl=5, ttl_completed=60)
+    reloader = Reloader(
+        args=argparse.Namespace(config=[str(path)], log_level=None),
+        results=results,
+        runtime=_runtime(config),
+    )
+    github, sandbox = reloader.runtime.drivers
+    keys = [(x.name, x.generation, "project", 1, 1) for x in (github, sandbox)]
+    for key in keys:
+        results.put(key, runs(checks.RunStatus.COMPLETED))
+
+    #
+    # A bad configuration keeps the current runtime
+    #
+    _write(path, _config("github, unknown", github=GITHUB))
+    current = reloader.runtime
+    reloader.reload()
+    assert reloader.runtime is current
+
+    #
+    # Only the changed driver is recreated and its results dropped
+    #
+    _write(path, _config("github, sandbox", github=GITHUB, sandbox={"runs": "3"}))
+    reloader.reload()
+    assert reloader.runtime is not current
+    assert reloader.runtime.config["sandbox"]["runs"] == "3"
+    assert reloader.runtime.drivers[0] is github
+    assert reloader.runtime.drivers[1] is not sandbox
+    assert results.get(keys[0]) is not None
+    assert results.get(keys[1], stale=True) is None
+
+    #
+    # Requests in progress keep the drivers they started with
+    #
+    assert current.drivers[1] is sandbox
+    assert sandbox.run(make_request(1), driver.Deadline(5))
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+import json
+import sys
+import typing
+
+import pytest
+
+from gerrit_checks_mock_fetch_endpoint import checks, result_cache
+from gerrit_checks_mock_fetch_endpoint.metrics import METRICS
+
+
+def _runs(count: int, status: checks.RunStatus = checks.RunStatus.COMPLETED) -> list[checks.CheckRun]:
+    return [
+        checks.CheckRun(  # type: ignore  # until python-3.11
+            checkName=f"check{i}",
+            status=status,
+            results=[],
+        )
+        for i in range(count)
+    ]
+
+
+def _key(change: int) -> result_cache.Key:
+    return ("github", 0, "project", change, 1)
+
+
+def _size(key: result_cache.Key, entry: result_cache.Entry) -> int:
+    return (
+        sys.getsizeof(key)
+        + sys.getsizeof(entry.fragments)
+        + sum(sys.getsizeof(fragment) for fragment in entry.fragments)
+        + result_cache.ENTRY_OVERHEAD
+    )
+
+
+def _bytes() -> typing.Any:
+    return METRICS.snapshot()["result_cache.bytes"]
+
+
+def test_assemble() -> None:
+    cache = result_cache.ResultCache(max_bytes=1 << 20, ttl=5, ttl_completed=60)
+    runs = _runs(3)
+    body = result_cache.assemble(
+        [
+            cache.put(_key(1), runs[:2]),
+            cache.put(_key(2), []),
+            cache.put(_key(3), runs[2:]),
+        ],
+    )
+    assert json.loads(body) == {"responseCode": "OK", "runs": json.loads(json.dumps(runs))}
+
+
+def test_byte_accounting() -> None:
+    cache = result_cache.ResultCache(max_bytes=1 << 20, ttl=5, ttl_completed=60)
+    first = cache.put(_key(1), _runs(3))
+    assert first.size == _size(_key(1), first)
+    second = cache.put(_key(2), _runs(5))
+    assert _bytes() == first.size + second.size
+
+    replaced = cache.put(_key(1), _runs(1))
+    assert _bytes() == replaced.size + second.size
+
+    other = cache.put(("github", 1, "project", 1, 1), _runs(1))
+    cache.discard("github", 0)
+    assert _bytes() == other.size
+    assert cache.get(_key(2)) is None
+
+
+def test_eviction() -> None:
+    entry_size = result_cache.ResultCache(max_bytes=1 << 20, ttl=5, ttl_completed=60).put(_key(0), _runs(2)).size
+    cache = result_cache.ResultCache(max_bytes=entry_size * 3, ttl=5, ttl_completed=60)
+    for change in range(3):
+        cache.put(_key(change), _runs(2))
+    assert cache.get(_key(0)) is not None
+
+    cache.put(_key(3), _runs(2))
+    assert cache.get(_key(1)) is None
+    assert cache.get(_key(0)) is not None
+    assert cache.get(_key(3)) is not None
+    assert _bytes() <= entry_size * 3
+
+
+def test_not_stored() -> None:
+    cache = result_cache.ResultCache(max_bytes=1 << 20, ttl=5, ttl_completed=60)
+    entry = cache.put(_key(1), _runs(1), store=False)
+    assert entry.fragments
+    assert cache.get(_key(1)) is None
+
+    small = result_cache.ResultCache(max_bytes=10, ttl=5, ttl_completed=60)
+    small.put(_key(1), _runs(1))
+    assert small.get(_key(1)) is None
+
+
+@pytest.mark.parametrize(
+    "runs, ttl",
+    [
+        (_runs(2), 60),
+        (_runs(2, checks.RunStatus.RUNNING), 5),
+        ([], 5),
+    ],
+)
+def test_ttl(monkeypatch: pytest.MonkeyPatch, runs: list[checks.CheckRun], ttl: float) -> None:
+    now = [1000.0]
+    monkeypatch.setattr("time.monotonic", lambda: now[0])
+    cache = result_cache.ResultCache(max_bytes=1 << 20, ttl=5, ttl_completed=60)
+    cache.put(_key(1), runs)
+
+    now[0] += ttl - 1
+    assert cache.get(_key(1)) is not None
+    now[0] += 2
+    assert cache.get(_key(1)) is None
+    assert cache.get(_key(1), stale=True) is not None
+
+
+def test_prewarm_ttl(monkeypatch: pytest.MonkeyPatch) -> None:
+    now = [1000.0]
+    monkeypatch.setattr("time.monotonic", lambda: now[0])
+    cache = result_cache.ResultCache(max_bytes=1 << 20, ttl=5, ttl_completed=60)
+    cache.put(_key(1), _runs(2, checks.RunStatus.RUNNING), ttl=120)
+    cache.put(_key(2), _runs(2, checks.RunStatus.RUNNING), ttl=120)
+
+    #
+    # Kept until the first hit, then expires as any other entry
+    #
+    now[0] += 100
+    assert cache.get(_key(1)) is not None
+    now[0] += 4
+    assert cache.get(_key(1)) is not None
+    now[0] += 2
+    assert cache.get(_key(1)) is None
+
+    assert cache.get(_key(2), stale=True) is not None
+    now[0] += 15
+    assert cache.get(_key(2)) is None
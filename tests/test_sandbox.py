@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+import concurrent.futures
+import configparser
+import typing
+
+import pytest
+
+from gerrit_checks_mock_fetch_endpoint import driver, driver_sandbox, fetch_endpoint
+
+from .fakes import make_request
+
+Outcome = typing.Union[str, list[typing.Any]]
+
+
+def _sandbox(seed: int = 0) -> driver_sandbox.Driver:
+    config = configparser.ConfigParser()
+    config.read_dict(
+        {
+            "sandbox": {
+                "runs": "2",
+                "failure_rate": "0.3",
+                "latency": "uniform:0,0.02",
+                "timeout": "0.01",
+                "seed": str(seed),
+            },
+        },
+    )
+    return driver_sandbox.Driver(name="sandbox", config=config["sandbox"])
+
+
+def _outcome(sandbox: driver_sandbox.Driver, request: fetch_endpoint.FetchEndpoint) -> Outcome:
+    try:
+        return sandbox.run(request, driver.Deadline(5))
+    except driver.UpstreamError as e:  # pylint: disable=invalid-name
+        return str(e)
+
+
+def _sequential(sandbox: driver_sandbox.Driver, changes: list[int]) -> dict[tuple[int, int], Outcome]:
+    #
+    # Outcomes by change and call number of the change
+    #
+    outcomes: dict[tuple[int, int], Outcome] = {}
+    for change in changes:
+        call = sum(1 for x in outcomes if x[0] == change)
+        outcomes[(change, call)] = _outcome(sandbox, make_request(change))
+    return outcomes
+
+
+def _concurrent(sandbox: driver_sandbox.Driver, changes: list[int]) -> dict[tuple[int, int], Outcome]:
+    #
+    # The changes interleave, each change is polled
+    # from its own thread
+    #
+    def poll(change: int) -> list[Outcome]:
+        return [_outcome(sandbox, make_request(change)) for _ in range(changes.count(change))]
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
+        polls = {change: executor.submit(poll, change) for change in set(changes)}
+    return {(change, call): x for change, future in polls.items() for call, x in enumerate(future.result())}
+
+
+def test_deterministic() -> None:
+    changes = [1, 2, 1, 3, 2, 1, 4, 5, 1, 3] * 3
+    expected = _sequential(_sandbox(), changes)
+    assert {x for x in expected.values() if isinstance(x, str)} == {"Simulated failure", "Simulated timeout"}
+    assert any(isinstance(x, list) for x in expected.values())
+
+    assert _sequential(_sandbox(), list(reversed(changes))) == expected
+    assert _sequential(_sandbox(), sorted(changes)) == expected
+    assert _concurrent(_sandbox(), changes) == expected
+
+
+@pytest.mark.parametrize("seed", [1, 2])
+def test_seed(seed: int) -> None:
+    changes = list(range(1, 20))
+    assert _sequential(_sandbox(seed), changes) != _sequential(_sandbox(), changes)
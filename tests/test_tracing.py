@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+import json
+import logging
+import pathlib
+import typing
+
+import pytest
+
+from gerrit_checks_mock_fetch_endpoint import tracing
+from gerrit_checks_mock_fetch_endpoint.metrics import METRICS
+
+
+def _slow_lines(caplog: pytest.LogCaptureFixture) -> list[dict[str, typing.Any]]:
+    prefix = "Slow request "
+    messages = [record.getMessage() for record in caplog.records]
+    return [json.loads(message.removeprefix(prefix)) for message in messages if message.startswith(prefix)]
+
+
+def test_untraced(caplog: pytest.LogCaptureFixture) -> None:
+    assert tracing.span("read") is tracing.span("write", driver="github")
+    with tracing.trace("abc", slow_threshold=0, profile_rate=0, profile_dir="/nonexistent"):
+        assert tracing.span("read") is tracing.span("write")
+        tracing.tag(project="project")
+    assert not _slow_lines(caplog)
+
+
+def test_slow(caplog: pytest.LogCaptureFixture) -> None:
+    caplog.set_level(logging.WARNING)
+    with tracing.trace("abc-1", slow_threshold=1e-9, profile_rate=0, profile_dir="/nonexistent"):
+        tracing.tag(project="project", changeId=1)
+        with tracing.span("read"):
+            pass
+        with tracing.span("driver", driver="github"):
+            with tracing.span("decode"):
+                pass
+    (line,) = _slow_lines(caplog)
+    assert line["id"] == "abc-1"
+    assert line["project"] == "project"
+    assert line["changeId"] == 1
+    assert line["duration"] >= 0
+    #
+    # Spans are recorded when they end
+    #
+    assert [(span["name"], span.get("driver")) for span in line["spans"]] == [
+        ("read", None),
+        ("decode", None),
+        ("driver", "github"),
+    ]
+    assert all(span["start"] >= 0 and span["duration"] >= 0 for span in line["spans"])
+
+
+def test_fast(caplog: pytest.LogCaptureFixture) -> None:
+    with tracing.trace("abc", slow_threshold=3600, profile_rate=0, profile_dir="/nonexistent"):
+        with tracing.span("read"):
+            pass
+    assert not _slow_lines(caplog)
+
+
+@pytest.mark.parametrize("request_id", [None, "", "../../etc/passwd", "x" * 65])
+def test_request_id(caplog: pytest.LogCaptureFixture, request_id: typing.Optional[str]) -> None:
+    with tracing.trace(request_id, slow_threshold=1e-9, profile_rate=0, profile_dir="/nonexistent"):
+        pass
+    (line,) = _slow_lines(caplog)
+    assert line["id"] != request_id
+    assert tracing.REQUEST_ID_RE.match(line["id"])
+
+
+def test_profile(tmp_path: pathlib.Path) -> None:
+    with tracing.trace("abc", slow_threshold=0, profile_rate=1, profile_dir=str(tmp_path)):
+        pass
+    assert (tmp_path / "fetch-abc.prof").stat().st_size > 0
+
+
+def test_profile_error(tmp_path: pathlib.Path) -> None:
+    errors = METRICS.snapshot().get("fetch.profile_errors", 0)
+    with tracing.trace("abc", slow_threshold=0, profile_rate=1, profile_dir=str(tmp_path / "missing")):
+        pass
+    assert METRICS.snapshot()["fetch.profile_errors"] == errors + 1
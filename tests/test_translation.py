@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+import configparser
+import json
+import threading
+import typing
+
+from gerrit_checks_mock_fetch_endpoint import (
+    driver,
+    driver_github,
+    fetch_endpoint,
+    recording,
+    result_cache,
+)
+from gerrit_checks_mock_fetch_endpoint.metrics import METRICS
+
+from .fakes import workflow_run
+
+REQUEST: typing.Final = typing.cast(
+    fetch_endpoint.FetchEndpoint,
+    {"project": "project", "changeId": 122, "revision": 9},
+)
+
+
+class Upstream:  # pylint: disable=too-few-public-methods
+    def __init__(self) -> None:
+        self.workflow_runs: list[dict[str, typing.Any]] = []
+
+    def __call__(  # pylint: disable=too-many-arguments, unused-argument
+        self,
+        url: str,
+        headers: dict[str, str],
+        timeout: float,
+        deadline: driver.Deadline,
+        cancelled: typing.Optional[threading.Event],
+    ) -> recording.Record:
+        body = json.dumps({"total_count": len(self.workflow_runs), "workflow_runs": self.workflow_runs})
+        return recording.Record(url=url, status=200, headers={}, body=body.encode("utf8"), latency=0)
+
+
+def _driver(name: str, translation_cache_size: int = 4096) -> tuple[driver_github.Driver, Upstream]:
+    config = configparser.ConfigParser()
+    config.read_dict(
+        {
+            name: {
+                "base_url": "https://example.com/repos/space",
+                "token": "abc",
+                "translation_cache_size": str(translation_cache_size),
+            },
+        },
+    )
+    github = driver_github.Driver(name=name, config=config[name])
+    upstream = Upstream()
+    github.set_transport(upstream)
+    return github, upstream
+
+
+def _counts(name: str) -> tuple[int, int]:
+    snapshot = METRICS.snapshot()
+    return snapshot.get(f"translation.{name}.hits", 0), snapshot.get(f"translation.{name}.misses", 0)
+
+
+def test_hits() -> None:
+    github, upstream = _driver("translation-hits")
+    upstream.workflow_runs = [workflow_run(1), workflow_run(2)]
+
+    first = github.run(REQUEST, driver.Deadline(5))
+    assert _counts("translation-hits") == (0, 2)
+    second = github.run(REQUEST, driver.Deadline(5))
+    assert _counts("translation-hits") == (2, 2)
+    assert all(x is y for x, y in zip(first, second))
+
+    #
+    # An updated run is translated again
+    #
+    upstream.workflow_runs = [workflow_run(1), workflow_run(2, updated_at="2022-01-01T00:01:00Z")]
+    third = github.run(REQUEST, driver.Deadline(5))
+    assert _counts("translation-hits") == (3, 3)
+    assert third[0] is first[0]
+    assert third[1] is not first[1]
+
+
+def test_bounded() -> None:
+    github, upstream = _driver("translation-bounded", translation_cache_size=2)
+    upstream.workflow_runs = [workflow_run(1), workflow_run(2), workflow_run(3)]
+    github.run(REQUEST, driver.Deadline(5))
+    assert _counts("translation-bounded") == (0, 3)
+
+    #
+    # Least recently used first: 1 was evicted by 3,
+    # translating it again evicts 2 and so on
+    #
+    github.run(REQUEST, driver.Deadline(5))
+    assert _counts("translation-bounded") == (0, 6)
+
+    upstream.workflow_runs = [workflow_run(2), workflow_run(3)]
+    github.run(REQUEST, driver.Deadline(5))
+    assert _counts("translation-bounded") == (2, 6)
+
+
+def test_encode() -> None:
+    github, upstream = _driver("translation-encode", translation_cache_size=1)
+    upstream.workflow_runs = [workflow_run(1), workflow_run(2)]
+    runs = github.run(REQUEST, driver.Deadline(5))
+    fragments = github.encode(runs)
+    assert fragments == result_cache.encode(runs)
+
+    #
+    # The cached fragment is reused, the evicted run is encoded again
+    #
+    assert fragments[1] is github.encode(runs)[1]
+    assert fragments[0] is not github.encode(runs)[0]
+
+    #
+    # Runs which were not translated by this driver are encoded
+    #
+    other = [dict(runs[1])]
+    assert github.encode(other) == result_cache.encode(other)  # type: ignore